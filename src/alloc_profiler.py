@@ -0,0 +1,250 @@
+# src/alloc_profiler.py
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+from src.common import logger
+
+
+class FrameAllocationStats:
+    def __init__(self):
+        self.frames = 0
+        self.total_peak_bytes = 0
+        self.max_peak_bytes = 0
+        self.total_net_bytes = 0
+        self.total_net_blocks = 0
+        self.counted_frames = 0
+        self.total_allocated_blocks = 0
+        self.max_allocated_blocks = 0
+
+    def add(self, peak_bytes, net_bytes, net_blocks, allocated_blocks):
+        self.frames += 1
+        if allocated_blocks is not None:
+            self.counted_frames += 1
+            self.total_allocated_blocks += allocated_blocks
+            self.max_allocated_blocks = max(self.max_allocated_blocks, allocated_blocks)
+        self.total_peak_bytes += peak_bytes
+        self.max_peak_bytes = max(self.max_peak_bytes, peak_bytes)
+        self.total_net_bytes += net_bytes
+        self.total_net_blocks += net_blocks
+
+
+class GCPauseStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.collected = 0
+
+    def add(self, duration, collected):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.collected += collected
+
+
+# notes: フレームごと・ゲームの状態ごとのメモリ確保を計測するクラス
+# 有効な間だけ tracemalloc と gc.callbacks を使い、無効時はフックを一切登録しない
+# 状態ごとのスナップショットは数十msかかるため state_snapshots で切り替えられる
+# 割り当てブロック数の集計もスナップショットを使うため、count_interval フレームに1回だけ行う（0で無効）
+class AllocationProfiler:
+    def __init__(
+        self,
+        top_n=15,
+        traceback_depth=1,
+        report_path=None,
+        state_snapshots=True,
+        count_interval=30,
+    ):
+        self.top_n = top_n
+        self.state_snapshots = state_snapshots
+        self.count_interval = count_interval
+        self.frame_count = 0
+        self.traceback_depth = traceback_depth
+        self.report_path = report_path
+        self.enabled = False
+
+        self.frame_stats = {}
+        self.recent_frames = deque(maxlen=600)
+        self.gc_stats = {}
+        self.gc_pauses = deque(maxlen=1000)
+        self.state_growth = {}
+
+        self._gc_start = None
+        self._frame_start = None
+        self._state = None
+        self._state_snapshot = None
+        self._baseline_snapshot = None
+
+    def start(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self.frame_stats = {}
+        self.recent_frames.clear()
+        self.gc_stats = {}
+        self.gc_pauses.clear()
+        self.state_growth = {}
+        self.frame_count = 0
+        self._state = None
+        self._state_snapshot = None
+
+        tracemalloc.start(self.traceback_depth)
+        gc.callbacks.append(self._gc_callback)
+        self._baseline_snapshot = self._take_snapshot()
+        logger.info("Allocation profiling started")
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        text = self.report()
+        gc.callbacks.remove(self._gc_callback)
+        tracemalloc.stop()
+        self._baseline_snapshot = None
+        self._state_snapshot = None
+        logger.info("Allocation profiling stopped")
+        return text
+
+    def toggle(self):
+        if self.enabled:
+            self.stop()
+        else:
+            self.start()
+
+    def _gc_callback(self, phase, info):
+        if phase == "start":
+            self._gc_start = time.perf_counter()
+        elif self._gc_start is not None:
+            duration = time.perf_counter() - self._gc_start
+            self._gc_start = None
+            generation = info["generation"]
+            stats = self.gc_stats.setdefault(generation, GCPauseStats())
+            stats.add(duration, info["collected"])
+            self.gc_pauses.append((self._state, generation, duration))
+
+    def _take_snapshot(self):
+        snapshot = tracemalloc.take_snapshot()
+        return snapshot.filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            )
+        )
+
+    # notes: 状態が変わったときにスナップショットを取り、直前の状態の間に増えたメモリを記録する
+    def _enter_state(self, state):
+        snapshot = self._take_snapshot()
+        if self._state_snapshot is not None and self._state is not None:
+            diff = snapshot.compare_to(self._state_snapshot, "lineno")
+            growth = self.state_growth.setdefault(self._state, {})
+            for stat in diff:
+                if stat.size_diff == 0:
+                    continue
+                key = str(stat.traceback[0])
+                size, count = growth.get(key, (0, 0))
+                growth[key] = (size + stat.size_diff, count + stat.count_diff)
+        self._state = state
+        self._state_snapshot = snapshot
+
+    def begin_frame(self, state):
+        if state != self._state:
+            if self.state_snapshots:
+                self._enter_state(state)
+            else:
+                self._state = state
+        self.frame_count += 1
+        snapshot = None
+        if self.count_interval and self.frame_count % self.count_interval == 0:
+            snapshot = self._take_snapshot()
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        self._frame_start = (current, sys.getallocatedblocks(), snapshot)
+
+    # notes: peak はフレーム内で一時的に確保された量、net はフレームの前後での増減
+    # allocated はフレームの前後のスナップショットを割り当て箇所ごとに比べて、増えたブロック数を合計したもの
+    # 他の箇所で確保されたブロックの解放とは相殺しないので、net が0でも割り当てのある箇所がここに現れる
+    # （同じ箇所で前のフレームの分を解放して作り直した分や、フレーム内で確保して解放した分は peak に現れる）
+    def end_frame(self):
+        if self._frame_start is None:
+            return
+        start_bytes, start_blocks, start_snapshot = self._frame_start
+        current, peak = tracemalloc.get_traced_memory()
+        net_blocks = sys.getallocatedblocks() - start_blocks
+        allocated_blocks = None
+        if start_snapshot is not None:
+            snapshot = self._take_snapshot()
+            allocated_blocks = sum(
+                stat.count_diff
+                for stat in snapshot.compare_to(start_snapshot, "traceback")
+                if stat.count_diff > 0
+            )
+        peak_bytes = peak - start_bytes
+        net_bytes = current - start_bytes
+        stats = self.frame_stats.setdefault(self._state, FrameAllocationStats())
+        stats.add(peak_bytes, net_bytes, net_blocks, allocated_blocks)
+        self.recent_frames.append(
+            (self._state, peak_bytes, net_bytes, net_blocks, allocated_blocks)
+        )
+        self._frame_start = None
+
+    def report(self):
+        lines = ["=== Allocation report ==="]
+        for state, stats in self.frame_stats.items():
+            frames = max(stats.frames, 1)
+            if stats.counted_frames:
+                allocated = (
+                    f"allocated blocks/frame avg"
+                    f" {stats.total_allocated_blocks / stats.counted_frames:.1f}"
+                    f" max {stats.max_allocated_blocks}"
+                    f" ({stats.counted_frames} frames counted)"
+                )
+            else:
+                allocated = "allocated blocks not counted"
+            lines.append(
+                f"[{state}] {stats.frames} frames, peak/frame avg"
+                f" {stats.total_peak_bytes / frames / 1024:.1f}KB max"
+                f" {stats.max_peak_bytes / 1024:.1f}KB, {allocated}, net/frame"
+                f" {stats.total_net_bytes / frames:+.0f}B"
+                f" {stats.total_net_blocks / frames:+.1f} blocks"
+            )
+
+        for generation, stats in sorted(self.gc_stats.items()):
+            lines.append(
+                f"GC gen{generation}: {stats.count} collections, total"
+                f" {stats.total * 1000:.1f}ms, max {stats.max * 1000:.2f}ms,"
+                f" collected {stats.collected}"
+            )
+
+        for state, growth in self.state_growth.items():
+            top = sorted(growth.items(), key=lambda item: -abs(item[1][0]))
+            top = top[: self.top_n // 3 or 1]
+            lines.append(f"[{state}] retained growth:")
+            lines.extend(
+                f"  {size / 1024:+.1f}KB ({count:+d} blocks) {site}"
+                for site, (size, count) in top
+            )
+
+        if self._baseline_snapshot is not None:
+            snapshot = self._take_snapshot()
+            lines.append(f"Top {self.top_n} allocation sites since start:")
+            diff = snapshot.compare_to(self._baseline_snapshot, "lineno")
+            for stat in diff[: self.top_n]:
+                lines.append(
+                    f"  {stat.size_diff / 1024:+.1f}KB ({stat.count_diff:+d} blocks)"
+                    f" {stat.traceback[0]}"
+                )
+
+        text = "\n".join(lines)
+        logger.info(text)
+        if self.report_path:
+            report_dir = os.path.dirname(self.report_path)
+            if report_dir:
+                os.makedirs(report_dir, exist_ok=True)
+            with open(self.report_path, "a", encoding="utf-8") as f:
+                f.write(text + "\n")
+        return text
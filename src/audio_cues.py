@@ -0,0 +1,141 @@
+# src/audio_cues.py
+from collections import deque
+
+import numpy as np
+import pygame
+
+from src.common import logger
+
+# notes: 合成する効果音の定義（周波数Hz, 長さ秒）の並び。周波数0は無音
+CUE_TONES = {
+    "countdown": [(880, 0.07)],
+    "show": [(660, 0.05), (990, 0.09)],
+    "go": [(1320, 0.12)],
+    "win": [(784, 0.08), (988, 0.08), (1319, 0.16)],
+    "lose": [(392, 0.12), (0, 0.03), (294, 0.2)],
+    "draw": [(587, 0.1), (0, 0.04), (587, 0.1)],
+}
+
+
+# notes: 正弦波を並べて効果音を作る（プチノイズを防ぐために各音の頭と終わりを短くフェードさせる）
+def synthesize(tones, sample_rate, channels, volume=0.5, fade=0.004):
+    parts = []
+    fade_samples = max(1, int(sample_rate * fade))
+    for frequency, duration in tones:
+        count = int(sample_rate * duration)
+        if frequency <= 0:
+            parts.append(np.zeros(count))
+            continue
+        t = np.arange(count) / sample_rate
+        wave = np.sin(2 * np.pi * frequency * t)
+        envelope = np.ones(count)
+        ramp = np.linspace(0.0, 1.0, min(fade_samples, count // 2))
+        if len(ramp):
+            envelope[: len(ramp)] = ramp
+            envelope[-len(ramp) :] = ramp[::-1]
+        parts.append(wave * envelope)
+    samples = (np.concatenate(parts) * volume * 32767).astype(np.int16)
+    if channels > 1:
+        samples = np.repeat(samples[:, None], channels, axis=1)
+    return np.ascontiguousarray(samples)
+
+
+# notes: 状態遷移に合わせて効果音を鳴らすクラス
+# 効果音は起動時にすべて合成してSoundにしておき、再生時はデコードもファイル読み込みもしない
+# 予定されていた遷移時刻から、チャンネルが再生中になった時刻にミキサーのバッファ分を足した出力開始までの遅れを効果音ごとに記録する
+# 再生を始めたチャンネルは get_busy() で確認し、その場で再生中にならなかったものは poll() で毎フレーム確認する
+class AudioCues:
+    def __init__(self, clock, sample_rate=44100, buffer_size=256, volume=0.5):
+        self.clock = clock
+        self.sample_rate = sample_rate
+        self.buffer_size = buffer_size
+        self.buffer_latency = buffer_size / sample_rate
+        self.sounds = {}
+        self.offsets = {}
+        self.pending = []
+        self.played = 0
+        self.missed = 0
+
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init(sample_rate, -16, 2, buffer_size)
+        except pygame.error as e:
+            logger.warning(f"Audio is disabled: {e}")
+            return
+
+        frequency, _, channels = pygame.mixer.get_init()
+        self.sample_rate = frequency
+        self.buffer_latency = buffer_size / frequency
+        for name, tones in CUE_TONES.items():
+            samples = synthesize(tones, frequency, channels, volume)
+            self.sounds[name] = pygame.sndarray.make_sound(samples)
+            self.offsets[name] = deque(maxlen=500)
+        logger.info(
+            f"Audio cues ready ({frequency}Hz, buffer {buffer_size} samples"
+            f" = {self.buffer_latency * 1000:.1f}ms)"
+        )
+
+    @property
+    def enabled(self):
+        return bool(self.sounds)
+
+    # notes: at は遷移が予定されていた時刻
+    def play(self, name, at):
+        sound = self.sounds.get(name)
+        if sound is None:
+            return
+        # notes: 空いているチャンネルがなければ一番古い音を止めて、合図が鳴らないことがないようにする
+        channel = pygame.mixer.find_channel(True)
+        channel.play(sound)
+        self.played += 1
+        if channel.get_busy():
+            self.record(name, at)
+        else:
+            self.pending.append((channel, sound, name, at))
+
+    # notes: 再生中になるのを待っているチャンネルを確認する（毎フレーム呼ぶ）
+    def poll(self):
+        if not self.pending:
+            return
+        waiting = []
+        for channel, sound, name, at in self.pending:
+            if channel.get_busy() and channel.get_sound() is sound:
+                self.record(name, at)
+            elif channel.get_sound() is sound:
+                waiting.append((channel, sound, name, at))
+            else:
+                # notes: 再生中になる前にチャンネルを別の音に取られた場合は計測から外す
+                self.missed += 1
+        self.pending = waiting
+
+    def record(self, name, at):
+        offset = self.clock.now() - at + self.buffer_latency
+        self.offsets[name].append(offset)
+
+    def summary(self):
+        lines = [
+            f"Audio cues: {self.played} played, {self.missed} not measured,"
+            f" offset from scheduled transition to output"
+            f" (includes {self.buffer_latency * 1000:.1f}ms mixer buffer):"
+        ]
+        for name, samples in self.offsets.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            mean = sum(ordered) / len(ordered)
+            p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+            lines.append(
+                f"  {name}: mean {mean * 1000:.2f}ms, p95 {p95 * 1000:.2f}ms"
+                f" ({len(ordered)} samples)"
+            )
+        return "\n".join(lines)
+
+    def close(self):
+        if self.enabled:
+            logger.info(self.summary())
+            pygame.mixer.quit()
+
+
+# notes: pygame.init() より前に呼んで、ミキサーを小さいバッファで初期化させる
+def pre_init_mixer(sample_rate=44100, buffer_size=256):
+    pygame.mixer.pre_init(sample_rate, -16, 2, buffer_size)
@@ -0,0 +1,364 @@
+# src/broadcast.py
+import argparse
+import selectors
+import socket
+import struct
+import threading
+import time
+
+from src.common import logger
+
+STATES = ["MENU", "COUNTDOWN", "SHOW_HANDS", "DETECT", "RESULT"]
+GESTURES = [None, "rock", "paper", "scissors"]
+RESULTS = [None, "win", "lose", "draw"]
+
+FRAME_KEY = 1
+FRAME_DELTA = 2
+
+# notes: 各フィールドの並び順とエンコード方式（ビットマスクのビット位置 = インデックス）
+FIELDS = [
+    "state",
+    "round",
+    "player_wins",
+    "computer_wins",
+    "draws",
+    "computer_gesture",
+    "player_gesture",
+    "result",
+    "reaction_time",
+    "landmarks",
+]
+FIELD_INDEX = {name: i for i, name in enumerate(FIELDS)}
+LANDMARKS_FIELD = FIELD_INDEX["landmarks"]
+ALL_FIELDS_MASK = (1 << len(FIELDS)) - 1
+
+HEADER = struct.Struct("<HBIIH")  # length, frame type, sequence, timestamp(ms), mask
+NO_REACTION = 0xFFFF
+
+
+def _encode_field(index, value, out):
+    name = FIELDS[index]
+    if name == "state":
+        out += struct.pack("<B", STATES.index(value))
+    elif name in ("round", "player_wins", "computer_wins", "draws"):
+        out += struct.pack("<H", min(value, 0xFFFF))
+    elif name in ("computer_gesture", "player_gesture"):
+        out += struct.pack("<B", GESTURES.index(value))
+    elif name == "result":
+        out += struct.pack("<B", RESULTS.index(value))
+    elif name == "reaction_time":
+        value = NO_REACTION if value is None else min(int(value * 1000), 0xFFFE)
+        out += struct.pack("<H", value)
+    elif name == "landmarks":
+        # notes: 0〜1の座標を16bitに量子化する（21点で84バイト）
+        points = value or []
+        out += struct.pack("<B", len(points))
+        for x, y in points:
+            out += struct.pack(
+                "<HH",
+                int(min(max(x, 0.0), 1.0) * 65535),
+                int(min(max(y, 0.0), 1.0) * 65535),
+            )
+
+
+def encode_frame(frame_type, sequence, timestamp_ms, snapshot, mask):
+    body = bytearray()
+    for index in range(len(FIELDS)):
+        if mask & (1 << index):
+            _encode_field(index, snapshot[index], body)
+    header = HEADER.pack(
+        HEADER.size + len(body), frame_type, sequence, timestamp_ms & 0xFFFFFFFF, mask
+    )
+    return header + bytes(body)
+
+
+def decode_frame(data, state):
+    length, frame_type, sequence, timestamp_ms, mask = HEADER.unpack_from(data)
+    if length != len(data):
+        raise ValueError(f"Frame length {length} does not match {len(data)} bytes")
+    offset = HEADER.size
+    if frame_type == FRAME_KEY:
+        state.clear()
+    for index, name in enumerate(FIELDS):
+        if not mask & (1 << index):
+            continue
+        if name == "state":
+            state[name] = STATES[data[offset]]
+            offset += 1
+        elif name in ("round", "player_wins", "computer_wins", "draws"):
+            (state[name],) = struct.unpack_from("<H", data, offset)
+            offset += 2
+        elif name in ("computer_gesture", "player_gesture"):
+            state[name] = GESTURES[data[offset]]
+            offset += 1
+        elif name == "result":
+            state[name] = RESULTS[data[offset]]
+            offset += 1
+        elif name == "reaction_time":
+            (value,) = struct.unpack_from("<H", data, offset)
+            state[name] = None if value == NO_REACTION else value / 1000
+            offset += 2
+        elif name == "landmarks":
+            count = data[offset]
+            offset += 1
+            points = []
+            for _ in range(count):
+                x, y = struct.unpack_from("<HH", data, offset)
+                points.append((x / 65535, y / 65535))
+                offset += 4
+            state[name] = points or None
+    return frame_type, sequence, timestamp_ms
+
+
+class Subscriber:
+    def __init__(self, conn, address):
+        self.conn = conn
+        self.address = address
+        self.buffer = bytearray()
+
+
+# notes: ゲームの状態をローカルソケットで配信するクラス
+# publish() は最新のスナップショットを置くだけで、エンコードと送信は別スレッドが一定のレートで行う
+# 送信バッファが max_buffer バイトを超えた遅い購読者は切断する
+class StatePublisher:
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=8765,
+        max_rate=30,
+        landmark_rate=15,
+        include_landmarks=False,
+        keyframe_interval=2.0,
+        max_buffer=64 * 1024,
+    ):
+        self.interval = 1.0 / max_rate
+        self.landmark_interval = 1.0 / landmark_rate
+        self.include_landmarks = include_landmarks
+        self.keyframe_interval = keyframe_interval
+        self.max_buffer = max_buffer
+
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((host, port))
+        self.server.listen()
+        self.server.setblocking(False)
+        self.address = self.server.getsockname()
+
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.server, selectors.EVENT_READ)
+        self.subscribers = {}
+        self.dropped_subscribers = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+
+        self._latest = None
+        self._last_sent = None
+        self._sequence = 0
+        self._start = time.monotonic()
+        self._last_keyframe = 0.0
+        self._last_landmarks_sent = 0.0
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name="StatePublisher", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Broadcasting game state on {self.address[0]}:{self.address[1]}")
+
+    # notes: 描画ループから呼ばれる（参照を置き換えるだけなのでブロックしない）
+    def publish(self, snapshot):
+        self._latest = snapshot
+
+    def _timestamp_ms(self):
+        return int((time.monotonic() - self._start) * 1000)
+
+    def _next_frame(self, now):
+        snapshot = self._latest
+        if snapshot is None:
+            return None
+        if not self.include_landmarks:
+            snapshot = snapshot[:LANDMARKS_FIELD] + (None,)
+
+        # notes: エンコードに失敗した場合に送っていない変更を送信済み扱いにしないよう、状態はエンコード後に更新する
+        if (
+            self._last_sent is None
+            or now - self._last_keyframe >= self.keyframe_interval
+        ):
+            frame = self._encode(FRAME_KEY, snapshot, ALL_FIELDS_MASK)
+            self._last_keyframe = now
+            self._last_landmarks_sent = now
+            self._last_sent = snapshot
+            return frame
+
+        mask = 0
+        for index in range(LANDMARKS_FIELD):
+            if snapshot[index] != self._last_sent[index]:
+                mask |= 1 << index
+        send_landmarks = (
+            snapshot[LANDMARKS_FIELD] is not self._last_sent[LANDMARKS_FIELD]
+            and now - self._last_landmarks_sent >= self.landmark_interval
+        )
+        if send_landmarks:
+            mask |= 1 << LANDMARKS_FIELD
+        else:
+            snapshot = snapshot[:LANDMARKS_FIELD] + (self._last_sent[LANDMARKS_FIELD],)
+        if not mask:
+            return None
+
+        frame = self._encode(FRAME_DELTA, snapshot, mask)
+        if send_landmarks:
+            self._last_landmarks_sent = now
+        self._last_sent = snapshot
+        return frame
+
+    def _encode(self, frame_type, snapshot, mask):
+        frame = encode_frame(
+            frame_type, self._sequence + 1, self._timestamp_ms(), snapshot, mask
+        )
+        self._sequence += 1
+        return frame
+
+    def _accept(self):
+        try:
+            conn, address = self.server.accept()
+        except BlockingIOError:
+            return
+        conn.setblocking(False)
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # notes: カーネルの送信バッファを小さくして、遅い購読者を早めに検知できるようにする
+        conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.max_buffer)
+        subscriber = Subscriber(conn, address)
+        self.subscribers[conn] = subscriber
+        self.selector.register(conn, selectors.EVENT_READ, subscriber)
+        # notes: 新しい購読者には現在の状態をキーフレームで送る
+        # 他の購読者の連番が飛ばないように、最後に送ったフレームと同じ連番を使う
+        if self._last_sent is not None:
+            subscriber.buffer += encode_frame(
+                FRAME_KEY,
+                self._sequence,
+                self._timestamp_ms(),
+                self._last_sent,
+                ALL_FIELDS_MASK,
+            )
+        logger.info(f"Spectator connected from {address[0]}:{address[1]}")
+
+    def _drop(self, subscriber, reason):
+        self.selector.unregister(subscriber.conn)
+        subscriber.conn.close()
+        del self.subscribers[subscriber.conn]
+        logger.info(f"Spectator {subscriber.address[0]} disconnected ({reason})")
+
+    def _flush(self, subscriber):
+        if not subscriber.buffer:
+            return
+        try:
+            sent = subscriber.conn.send(subscriber.buffer)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._drop(subscriber, str(e))
+            return
+        del subscriber.buffer[:sent]
+        self.bytes_sent += sent
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while self._running:
+            timeout = max(0.0, next_tick - time.monotonic())
+            for key, _ in self.selector.select(timeout):
+                if key.fileobj is self.server:
+                    self._accept()
+                    continue
+                # notes: 購読者からの受信は切断の検知にのみ使う
+                try:
+                    if not key.data.conn.recv(1024):
+                        self._drop(key.data, "closed")
+                except BlockingIOError:
+                    pass
+                except OSError as e:
+                    self._drop(key.data, str(e))
+
+            now = time.monotonic()
+            if now < next_tick:
+                continue
+            next_tick = now + self.interval
+
+            # notes: 想定外の値でエンコードに失敗しても、配信スレッドを止めずにこのフレームだけ飛ばす
+            try:
+                frame = self._next_frame(now)
+            except Exception as e:
+                logger.exception(f"Failed to encode a state frame: {e}")
+                frame = None
+            for subscriber in list(self.subscribers.values()):
+                if frame is not None:
+                    subscriber.buffer += frame
+                if len(subscriber.buffer) > self.max_buffer:
+                    self.dropped_subscribers += 1
+                    self._drop(subscriber, "too slow")
+                    continue
+                self._flush(subscriber)
+            if frame is not None:
+                self.frames_sent += 1
+
+    def close(self):
+        self._running = False
+        self._thread.join()
+        for subscriber in list(self.subscribers.values()):
+            self._drop(subscriber, "shutdown")
+        self.selector.close()
+        self.server.close()
+
+
+# notes: 配信を受信して状態を復元するクライアント（セカンドスクリーンやテスト用）
+class StateSubscriber:
+    def __init__(self, host="127.0.0.1", port=8765, timeout=5.0):
+        self.conn = socket.create_connection((host, port), timeout=timeout)
+        self.buffer = bytearray()
+        self.state = {}
+        self.last_sequence = None
+
+    def receive(self):
+        while True:
+            if len(self.buffer) >= 2:
+                (length,) = struct.unpack_from("<H", self.buffer)
+                if len(self.buffer) >= length:
+                    frame = bytes(self.buffer[:length])
+                    del self.buffer[:length]
+                    frame_type, sequence, _ = decode_frame(frame, self.state)
+                    self.last_sequence = sequence
+                    return frame_type, dict(self.state)
+            chunk = self.conn.recv(4096)
+            if not chunk:
+                raise ConnectionError("Publisher closed the connection")
+            self.buffer += chunk
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the broadcast game state")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    subscriber = StateSubscriber(args.host, args.port)
+    try:
+        while True:
+            _, state = subscriber.receive()
+            landmarks = state.get("landmarks")
+            logger.info(
+                f"{state['state']} round {state['round']}"
+                f" you {state['player_wins']} - {state['computer_wins']} cpu"
+                f" (draws {state['draws']}) {state['computer_gesture']}"
+                f" vs {state['player_gesture']} result {state['result']}"
+                f" reaction {state['reaction_time']}"
+                f" landmarks {len(landmarks) if landmarks else 0}"
+            )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        subscriber.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 # src/detector.py
 import math
+import os
 import warnings
 
 import mediapipe as mp
@@ -8,25 +9,58 @@ from OpenGL.GLU import *
 from OpenGL.GLUT import *
 from pygame.locals import *
 
+from src.common import logger
+from src.gesture_classifier import RuleGestureClassifier, load_gesture_model
+
 warnings.filterwarnings("ignore")
 warnings.simplefilter("ignore")
 
 
 class HandGestureDetector:
-    def __init__(self):
+    def __init__(self, use_mediapipe=True):
         self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=1,
-            min_detection_confidence=0.8,
-            min_tracking_confidence=0.7,
-        )
+        self.hands = None
+        if use_mediapipe:
+            self.hands = self.mp_hands.Hands(
+                static_image_mode=False,
+                max_num_hands=1,
+                min_detection_confidence=0.8,
+                min_tracking_confidence=0.7,
+            )
         self.mp_drawing = mp.solutions.drawing_utils
 
         self.gesture_buffer = []
         self.buffer_size = 5
         self.confidence_threshold = 0.6
 
+        # notes: ジェスチャー判定のバックエンド（ルール or 学習済みモデル）
+        self.backends = {RuleGestureClassifier.name: RuleGestureClassifier(self)}
+        model_path = os.getenv("GESTURE_MODEL_PATH")
+        if model_path and os.path.exists(model_path):
+            model = load_gesture_model(model_path)
+            self.backends[model.name] = model
+        self.classifier = self.backends[RuleGestureClassifier.name]
+        self.set_backend(os.getenv("GESTURE_CLASSIFIER", RuleGestureClassifier.name))
+
+    def set_backend(self, name):
+        if name not in self.backends:
+            logger.warning(f"Gesture classifier '{name}' is not available, using rules")
+            name = RuleGestureClassifier.name
+        self.classifier = self.backends[name]
+        self.buffer_size = int(
+            os.getenv("GESTURE_BUFFER_SIZE", self.classifier.buffer_size)
+        )
+        self.gesture_buffer = []
+        logger.info(
+            f"Gesture classifier: {name} (smoothing buffer {self.buffer_size} frames)"
+        )
+
+    # notes: 利用可能なバックエンドを順番に切り替える
+    def cycle_backend(self):
+        names = list(self.backends)
+        current = names.index(self.classifier.name)
+        self.set_backend(names[(current + 1) % len(names)])
+
     def calculate_distance(self, point1, point2):
         return math.sqrt((point1[0] - point2[0]) ** 2 + (point1[1] - point2[1]) ** 2)
 
@@ -191,7 +225,7 @@ class HandGestureDetector:
         return "unknown"
 
     def detect_gesture(self, landmarks):
-        current_gesture = self.detect_gesture_detailed(landmarks)
+        current_gesture = self.classifier.classify(landmarks)
 
         self.gesture_buffer.append(current_gesture)
         if len(self.gesture_buffer) > self.buffer_size:
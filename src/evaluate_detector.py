@@ -0,0 +1,355 @@
+# src/evaluate_detector.py
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from src.common import logger
+from src.detector import HandGestureDetector
+from src.gesture_classifier import (
+    confusion_matrix,
+    format_confusion_matrix,
+    load_landmark_records,
+)
+from src.gesture_predictor import GesturePredictor
+
+GESTURE_LABELS = ["rock", "paper", "scissors", "unknown"]
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+NO_HAND = "no_hand"
+
+# notes: 確定までの時間の起点（動画はクリップの先頭、ランドマークの記録は手が写った最初のフレーム）
+# 記録には手が見つかったフレームしか残らないため、記録の値には手を出すまでの時間が含まれない
+CLIP_START = "clip_start"
+FIRST_HAND = "first_hand"
+
+# notes: ワーカープロセスごとに1つだけ作る検出器と予測器（initializer で設定する）
+_detector = None
+_predictor = None
+_options = None
+
+
+def collect_sources(inputs):
+    paths = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for name in sorted(
+                glob.glob(os.path.join(path, "**", "*"), recursive=True)
+            ):
+                if name.endswith(".jsonl") or name.lower().endswith(VIDEO_EXTENSIONS):
+                    paths.append(name)
+        else:
+            paths.append(path)
+    return paths
+
+
+# notes: 動画のラベルは親ディレクトリ名かファイル名の先頭（rock/clip01.mp4, rock_01.mp4 など）から決める
+def label_for_clip(path):
+    parent = os.path.basename(os.path.dirname(path)).lower()
+    stem = os.path.splitext(os.path.basename(path))[0].lower()
+    for label in GESTURE_LABELS:
+        if parent == label or stem.startswith(label):
+            return label
+    return None
+
+
+def init_worker(options):
+    global _detector, _predictor, _options
+    _options = options
+    if options["model_path"]:
+        os.environ["GESTURE_MODEL_PATH"] = options["model_path"]
+    _detector = HandGestureDetector(use_mediapipe=False)
+    _detector.set_backend(options["classifier"])
+    if options["buffer_size"]:
+        _detector.buffer_size = options["buffer_size"]
+    if options["confidence_threshold"] is not None:
+        _detector.confidence_threshold = options["confidence_threshold"]
+    _predictor = None
+    if options["predictive"]:
+        _predictor = GesturePredictor(threshold=options["prediction_threshold"])
+
+
+# notes: 1回の試行（ゲームのDETECT 1回分）を評価するクラス
+class SegmentEvaluator:
+    def __init__(self, label, started_at, origin):
+        self.label = label
+        self.started_at = started_at
+        self.origin = origin
+        self.first_correct = None
+        self.pairs = Counter()
+        self.frames = 0
+        self.committed = None
+        self.settled = False
+        _detector.gesture_buffer = []
+        if _predictor:
+            _predictor.reset()
+
+    # notes: ゲームの apply_detection と同じく、手が見つからないフレームでは平滑化のバッファと予測をリセットする
+    # 先読みで確定した手は、手が見えなくなっても取り消さない
+    def feed(self, landmarks, timestamp):
+        self.frames += 1
+        if landmarks is None:
+            _detector.gesture_buffer = []
+            if _predictor:
+                _predictor.reset()
+            predicted = self.committed or NO_HAND
+        else:
+            predicted = _detector.detect_gesture(landmarks)
+            if _predictor:
+                predicted = self.predict(landmarks, predicted, timestamp)
+        self.pairs[(self.label, predicted)] += 1
+        if self.first_correct is None and predicted == self.label:
+            self.first_correct = timestamp - self.started_at
+
+    # notes: JankenGame.predict_gesture と同じ規則で、最初の予測を平滑化で確定するまで保持する
+    def predict(self, landmarks, settled, timestamp):
+        prediction = _predictor.update(landmarks, timestamp)
+        if settled != "unknown":
+            self.settled = True
+            self.committed = settled
+            return settled
+        if prediction is not None and not self.settled and self.committed is None:
+            self.committed = prediction[0]
+        return self.committed or settled
+
+    def result(self):
+        return {
+            "label": self.label,
+            "latency": self.first_correct,
+            "origin": self.origin,
+        }
+
+
+def evaluate_recording(path):
+    segments = []
+    current = None
+    previous_t = None
+    for record in load_landmark_records(path):
+        label = record.get("label")
+        landmarks = record.get("landmarks")
+        if label is None:
+            continue
+        t = record.get("t", 0.0)
+        # notes: ラベルが変わったときと記録が途切れたときに別の試行として扱う
+        if (
+            current is None
+            or label != current.label
+            or t - previous_t > _options["segment_gap"]
+        ):
+            current = SegmentEvaluator(label, t, FIRST_HAND)
+            segments.append(current)
+        current.feed(landmarks, t)
+        previous_t = t
+    return segments
+
+
+def evaluate_clip(path):
+    label = label_for_clip(path)
+    if label is None:
+        logger.warning(f"Skipping {path}: cannot infer the label from its name")
+        return []
+
+    # notes: 追跡の状態がクリップをまたがないように、クリップごとに新しい Hands を作る
+    hands = _detector.mp_hands.Hands(
+        static_image_mode=False,
+        max_num_hands=1,
+        min_detection_confidence=0.8,
+        min_tracking_confidence=0.7,
+    )
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    segment = SegmentEvaluator(label, 0.0, CLIP_START)
+    frame_index = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if _options["mirror"]:
+            frame = cv2.flip(frame, 1)
+        results = hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        landmarks = None
+        if results.multi_hand_landmarks:
+            hand_landmarks = results.multi_hand_landmarks[0]
+            landmarks = [[lm.x, lm.y] for lm in hand_landmarks.landmark]
+        segment.feed(landmarks, frame_index / fps)
+        frame_index += 1
+    cap.release()
+    hands.close()
+    return [segment]
+
+
+def evaluate_source(path):
+    started = time.process_time()
+    if path.endswith(".jsonl"):
+        segments = evaluate_recording(path)
+    else:
+        segments = evaluate_clip(path)
+    pairs = Counter()
+    for segment in segments:
+        pairs.update(segment.pairs)
+    return {
+        "path": path,
+        "pairs": sorted(pairs.items()),
+        "segments": [segment.result() for segment in segments],
+        "frames": sum(segment.frames for segment in segments),
+        "cpu_time": time.process_time() - started,
+    }
+
+
+# notes: ワーカー数に関係なく同じ結果になるように、結果は入力の順番で集計する
+def run_evaluation(paths, options, workers):
+    if workers <= 1:
+        init_worker(options)
+        return [evaluate_source(path) for path in paths]
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=init_worker,
+        initargs=(options,),
+    ) as executor:
+        return list(executor.map(evaluate_source, paths))
+
+
+def summarize(results):
+    pairs = Counter()
+    latencies = {}
+    origins = {}
+    frames = 0
+    cpu_time = 0.0
+    for result in results:
+        for (true_label, predicted), count in result["pairs"]:
+            pairs[(true_label, predicted)] += count
+        for segment in result["segments"]:
+            latencies.setdefault(segment["label"], []).append(segment["latency"])
+            origins.setdefault(segment["label"], set()).add(segment["origin"])
+        frames += result["frames"]
+        cpu_time += result["cpu_time"]
+
+    true_labels = []
+    predicted_labels = []
+    for (true_label, predicted), count in sorted(pairs.items()):
+        true_labels.extend([true_label] * count)
+        predicted_labels.extend([predicted] * count)
+
+    latency_summary = {}
+    for label, values in sorted(latencies.items()):
+        committed = sorted(value for value in values if value is not None)
+        latency_summary[label] = {
+            "segments": len(values),
+            "committed": len(committed),
+            "measured_from": sorted(origins[label]),
+            "mean": float(np.mean(committed)) if committed else None,
+            "median": float(np.median(committed)) if committed else None,
+            "p90": committed[min(len(committed) - 1, int(0.9 * len(committed)))]
+            if committed
+            else None,
+        }
+    return true_labels, predicted_labels, latency_summary, frames, cpu_time
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Evaluate the gesture detection pipeline on labeled clips or landmark recordings"
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="Videos, landmark recordings (.jsonl) or directories"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--classifier", default="rules")
+    parser.add_argument("--model-path", help="Learned model for --classifier")
+    parser.add_argument("--buffer-size", type=int, help="Smoothing buffer frames")
+    parser.add_argument("--confidence-threshold", type=float)
+    parser.add_argument(
+        "--segment-gap",
+        type=float,
+        default=0.5,
+        help="Gap in seconds that starts a new trial in landmark recordings",
+    )
+    parser.add_argument("--no-mirror", action="store_true")
+    parser.add_argument(
+        "--predictive",
+        action="store_true",
+        help="Commit early with the gesture predictor, as PREDICTIVE_COMMIT=1 does",
+    )
+    parser.add_argument("--prediction-threshold", type=float, default=0.8)
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    paths = collect_sources(args.inputs)
+    if not paths:
+        logger.error("No clips or landmark recordings found")
+        return
+    options = {
+        "classifier": args.classifier,
+        "model_path": args.model_path,
+        "buffer_size": args.buffer_size,
+        "confidence_threshold": args.confidence_threshold,
+        "segment_gap": args.segment_gap,
+        "mirror": not args.no_mirror,
+        "predictive": args.predictive,
+        "prediction_threshold": args.prediction_threshold,
+    }
+
+    started = time.perf_counter()
+    results = run_evaluation(paths, options, min(args.workers, len(paths)))
+    elapsed = time.perf_counter() - started
+    true_labels, predicted_labels, latencies, frames, cpu_time = summarize(results)
+    if not frames:
+        logger.error("No labeled frames found")
+        return
+
+    labels = sorted(set(true_labels) | set(predicted_labels))
+    matrix = confusion_matrix(true_labels, predicted_labels, labels)
+    accuracy = sum(t == p for t, p in zip(true_labels, predicted_labels)) / frames
+    logger.info(f"Evaluated {len(paths)} sources, {frames} frames")
+    output_name = "predictive commit" if args.predictive else "smoothed output"
+    logger.info(f"Frame accuracy ({output_name}): {accuracy:.1%}")
+    logger.info(
+        "Confusion matrix (rows: true, columns: committed output)\n"
+        + format_confusion_matrix(matrix, labels)
+    )
+    for label, summary in latencies.items():
+        if summary["committed"]:
+            logger.info(
+                f"[{label}] first correct commit in {summary['committed']}"
+                f"/{summary['segments']} trials: mean {summary['mean'] * 1000:.0f}ms,"
+                f" median {summary['median'] * 1000:.0f}ms,"
+                f" p90 {summary['p90'] * 1000:.0f}ms"
+                f" (measured from {' / '.join(summary['measured_from'])})"
+            )
+        else:
+            logger.info(f"[{label}] never committed in {summary['segments']} trials")
+    logger.info(
+        f"Throughput: {frames / elapsed:.1f} frames/s wall,"
+        f" {frames / max(cpu_time, 1e-9):.1f} frames/s per worker"
+    )
+
+    if args.output:
+        output_dir = os.path.dirname(args.output)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "labels": labels,
+                    "confusion_matrix": matrix.tolist(),
+                    "accuracy": accuracy,
+                    "latency": latencies,
+                    "frames": frames,
+                    "frames_per_second": frames / elapsed,
+                },
+                f,
+                indent=2,
+            )
+        logger.info(f"Saved report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
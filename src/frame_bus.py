@@ -0,0 +1,243 @@
+# src/frame_bus.py
+import threading
+from collections import deque
+
+import cv2
+import numpy as np
+
+from src.common import logger
+
+
+# notes: リングの1枠分のバッファ
+# 参照カウントが0に戻るまで次のキャプチャで上書きしないので、利用側はコピーせずにそのまま読める
+class FrameSlot:
+    def __init__(self, bus, shape):
+        self.bus = bus
+        self.buffer = np.empty(shape, dtype=np.uint8)
+        # notes: 利用側には書き込みできないビューだけを渡す
+        self.frame = self.buffer.view()
+        self.frame.flags.writeable = False
+        self.sequence = 0
+        self.captured_at = None
+        self.refs = 0
+
+    # notes: 次のキャプチャより後まで使う場合は retain し、使い終わったら release する
+    def retain(self):
+        self.bus._retain(self)
+        return self
+
+    def release(self):
+        self.bus._release(self)
+
+
+# notes: フレームバスの購読者
+# 受け取る間隔（max_rate）と、キューが一杯のときにどちらを捨てるか（drop_policy）を購読者ごとに指定する
+class FrameSubscription:
+    def __init__(self, bus, name, max_rate=None, max_queue=1, drop_policy="oldest"):
+        self.bus = bus
+        self.name = name
+        self.interval = 1.0 / max_rate if max_rate else 0.0
+        self.max_queue = max(1, max_queue)
+        self.drop_policy = drop_policy
+        self.queue = deque()
+        self.last_accepted = None
+        self.accepted = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.closed = False
+        # notes: 一時停止中は参照を取らずに読み飛ばす（録画の区切りの外など）
+        self.paused = False
+
+    # notes: バスのロックを持った状態で呼ばれる。待つことはせず、溢れた分は drop_policy に従って捨てる
+    def _offer(self, slot):
+        if self.paused:
+            return
+        # notes: キャプチャ間隔の揺れで1枚余計に間引かないように、少し早く届いたフレームも受け取る
+        if (
+            self.last_accepted is not None
+            and slot.captured_at - self.last_accepted < self.interval * 0.9
+        ):
+            self.skipped += 1
+            return
+        if len(self.queue) >= self.max_queue:
+            self.dropped += 1
+            if self.drop_policy == "newest":
+                return
+            self.bus._release_locked(self.queue.popleft())
+        self.last_accepted = slot.captured_at
+        slot.refs += 1
+        self.queue.append(slot)
+        self.accepted += 1
+
+    # notes: 受け取ったフレームは使い終わったら release する（timeout で None が返ることがある）
+    def get(self, timeout=None):
+        with self.bus.condition:
+            self.bus.condition.wait_for(lambda: self.queue or self.closed, timeout)
+            return self.queue.popleft() if self.queue else None
+
+    def poll(self):
+        with self.bus.condition:
+            return self.queue.popleft() if self.queue else None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+    def summary(self):
+        return (
+            f"{self.name}: {self.accepted} accepted, {self.dropped} dropped,"
+            f" {self.skipped} skipped by rate"
+        )
+
+
+# notes: キャプチャしたフレームを一度だけリングのバッファに書き込み、複数の利用者で共有するクラス
+# 最新のフレームは次の publish までバス自身が1つ参照を持つので、描画側は release しなくてよい
+# 空きバッファがない場合も待たずにリングを広げるので、遅い利用者がキャプチャや描画を止めることはない
+# 広げられるのは max_buffers と購読者のキューの長さの合計までで、それを超える場合（参照の返し忘れなど）はフレームを捨てる
+# 定常状態では同じバッファを使い回すため、フレームごとの配列の確保は発生しない
+class FrameBus:
+    def __init__(self, ring_size=4, max_buffers=16, mirror=True):
+        self.ring_size = ring_size
+        self.max_buffers = max(ring_size, max_buffers)
+        self.mirror = mirror
+        self.shape = None
+        self.slots = []
+        self.free = deque()
+        self.scratch = None
+        self.latest = None
+        self.sequence = 0
+        self.grown = 0
+        self.dropped = 0
+        self.read_failures = 0
+        self.subscriptions = []
+        self.condition = threading.Condition()
+
+    def subscribe(self, name, max_rate=None, max_queue=1, drop_policy="oldest"):
+        subscription = FrameSubscription(self, name, max_rate, max_queue, drop_policy)
+        with self.condition:
+            self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.condition:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+            while subscription.queue:
+                self._release_locked(subscription.queue.popleft())
+            subscription.closed = True
+            self.condition.notify_all()
+
+    # notes: カメラから1フレーム読み込んで公開する。読み込み先のバッファも使い回す
+    def capture(self, cap, clock):
+        if self.scratch is None:
+            ret, raw = cap.read()
+        else:
+            ret, raw = cap.read(self.scratch)
+        if not ret:
+            self.read_failures += 1
+            return None
+        captured_at = clock.now()
+        self.scratch = raw
+        return self.write(raw, captured_at, 1 if self.mirror else None)
+
+    # notes: 任意の配列を空いているバッファに写して公開する（flip_code を指定すると写すときに反転する）
+    # 空きバッファを用意できなかった場合は None を返す
+    def write(self, source, captured_at, flip_code=None):
+        if source.shape != self.shape:
+            self._resize(source.shape)
+        slot = self._acquire()
+        if slot is None:
+            return None
+        if flip_code is None:
+            np.copyto(slot.buffer, source)
+        else:
+            cv2.flip(source, flip_code, dst=slot.buffer)
+        self.publish(slot, captured_at)
+        return slot
+
+    def publish(self, slot, captured_at):
+        with self.condition:
+            self.sequence += 1
+            slot.sequence = self.sequence
+            slot.captured_at = captured_at
+            slot.refs = 1
+            previous = self.latest
+            self.latest = slot
+            for subscription in self.subscriptions:
+                subscription._offer(slot)
+            if previous is not None:
+                self._release_locked(previous)
+            self.condition.notify_all()
+
+    # notes: 解像度が変わった場合は新しいサイズでリングを作り直す（参照中の古いバッファは返却時に捨てる）
+    @property
+    def buffer_limit(self):
+        return self.max_buffers + sum(sub.max_queue for sub in self.subscriptions)
+
+    def _resize(self, shape):
+        with self.condition:
+            self.shape = shape
+            self.free.clear()
+            self.slots = [FrameSlot(self, shape) for _ in range(self.ring_size)]
+            self.free.extend(self.slots)
+        logger.info(
+            f"Frame bus: {self.ring_size} buffers of {shape[1]}x{shape[0]}"
+            f" ({self.ring_size * np.prod(shape) / 1e6:.1f}MB)"
+        )
+
+    def _acquire(self):
+        with self.condition:
+            if self.free:
+                return self.free.popleft()
+            limit = self.buffer_limit
+            if len(self.slots) >= limit:
+                self.dropped += 1
+                slot = None
+            else:
+                # notes: すべてのバッファが参照中なら、待たずにリングを1枠広げる（以降はその数で使い回す）
+                slot = FrameSlot(self, self.shape)
+                self.slots.append(slot)
+                self.grown += 1
+        # notes: 回数は summary で出すので、ログはそれぞれ最初の1回だけにする
+        if slot is None:
+            if self.dropped == 1:
+                logger.warning(
+                    f"Frame bus: all {limit} buffers are still referenced,"
+                    " dropping frames (a consumer may not be releasing them)"
+                )
+        elif self.grown == 1:
+            logger.info(
+                f"Frame bus grew beyond {self.ring_size} buffers for slow consumers"
+            )
+        return slot
+
+    def _retain(self, slot):
+        with self.condition:
+            slot.refs += 1
+
+    def _release(self, slot):
+        with self.condition:
+            self._release_locked(slot)
+
+    def _release_locked(self, slot):
+        slot.refs -= 1
+        if slot.refs == 0 and slot.buffer.shape == self.shape:
+            self.free.append(slot)
+
+    def summary(self):
+        lines = [
+            f"Frame bus: {self.sequence} frames published,"
+            f" {len(self.slots)} buffers ({self.grown} grown),"
+            f" {self.dropped} dropped for lack of buffers"
+        ]
+        for subscription in self.subscriptions:
+            lines.append(f"  {subscription.summary()}")
+        return "\n".join(lines)
+
+    def close(self):
+        logger.info(self.summary())
+        for subscription in list(self.subscriptions):
+            subscription.close()
+        with self.condition:
+            if self.latest is not None:
+                self._release_locked(self.latest)
+                self.latest = None
@@ -0,0 +1,139 @@
+# src/frame_pacing.py
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from src.common import logger
+
+
+# notes: sleepとスピンを組み合わせて次のフレームの締め切りまで待つクラス
+# 粗いsleepは締め切りの spin_threshold 秒前までに留め、残りはビジーウェイトで合わせる
+class FramePacer:
+    def __init__(self, target_fps=60, spin_threshold=0.002):
+        self.frame_interval = 1.0 / target_fps
+        self.spin_threshold = spin_threshold
+        self.next_deadline = None
+        self.missed_deadlines = 0
+
+    def wait(self):
+        now = time.perf_counter()
+        if self.next_deadline is None:
+            self.next_deadline = now + self.frame_interval
+            return now
+
+        remaining = self.next_deadline - now
+        if remaining > self.spin_threshold:
+            time.sleep(remaining - self.spin_threshold)
+        while time.perf_counter() < self.next_deadline:
+            pass
+
+        now = time.perf_counter()
+        # notes: 1フレーム以上遅れた場合は遅れを取り戻そうとせず、締め切りを現在時刻に合わせ直す
+        if now - self.next_deadline > self.frame_interval:
+            self.missed_deadlines += 1
+            self.next_deadline = now + self.frame_interval
+        else:
+            self.next_deadline += self.frame_interval
+        return now
+
+
+# notes: 入力（カメラのキャプチャ）から画面表示までの遅延をフレームごとに記録するクラス
+class LatencyTracker:
+    def __init__(self, window_size=300, report_interval=600):
+        self.samples = deque(maxlen=window_size)
+        self.report_interval = report_interval
+        self.frame_count = 0
+
+    def record(self, captured_at, presented_at):
+        self.samples.append(presented_at - captured_at)
+        self.frame_count += 1
+        if self.frame_count % self.report_interval == 0:
+            logger.info(
+                f"Input-to-present latency: mean {self.mean * 1000:.1f}ms,"
+                f" p95 {self.percentile(0.95) * 1000:.1f}ms,"
+                f" max {max(self.samples) * 1000:.1f}ms"
+            )
+
+    @property
+    def mean(self):
+        return sum(self.samples) / len(self.samples) if self.samples else 0.0
+
+    def percentile(self, q):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class DetectionResult:
+    def __init__(self, sequence, captured_at, multi_hand_landmarks):
+        self.sequence = sequence
+        self.captured_at = captured_at
+        self.multi_hand_landmarks = multi_hand_landmarks
+
+
+# notes: MediaPipeの推論を別スレッドで実行するクラス
+# 未処理のフレームは常に最新の1枚だけを保持し、古いフレームは推論せずに捨てる
+# フレームバスのバッファを渡された場合は、推論が終わるか捨てるまで参照を持つ
+class DetectionWorker:
+    def __init__(self, hands):
+        self.hands = hands
+        self.condition = threading.Condition()
+        self.pending = None
+        self.latest_result = None
+        self.sequence = 0
+        self.skipped_frames = 0
+        self.running = True
+        self.thread = threading.Thread(
+            target=self._run, name="DetectionWorker", daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, frame, captured_at, slot=None):
+        if slot is not None:
+            slot.retain()
+        with self.condition:
+            if self.pending is not None:
+                self.skipped_frames += 1
+                self._release(self.pending)
+            self.sequence += 1
+            self.pending = (self.sequence, frame, captured_at, slot)
+            self.condition.notify()
+
+    # notes: 描画の直前に呼び出して、その時点で最新の推論結果を取得する
+    def latest(self):
+        return self.latest_result
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running and self.pending is None:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                pending = self.pending
+                self.pending = None
+
+            sequence, frame, captured_at, _ = pending
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            self._release(pending)
+            results = self.hands.process(rgb_frame)
+            self.latest_result = DetectionResult(
+                sequence, captured_at, results.multi_hand_landmarks
+            )
+
+    @staticmethod
+    def _release(pending):
+        if pending[3] is not None:
+            pending[3].release()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join()
+        if self.pending is not None:
+            self._release(self.pending)
+            self.pending = None
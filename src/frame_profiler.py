@@ -0,0 +1,165 @@
+# src/frame_profiler.py
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+
+from src.common import logger
+
+
+# notes: 決められたフレーム数だけ cProfile で計測し、ゲームの状態ごとに結果を分けて保存するクラス
+# 状態ごとに別の Profile を持ち、フレームの開始時に現在の状態のものだけを有効にする
+# 無効な間はフックを一切登録しないので、ゲームループへのオーバーヘッドはない
+class FrameProfiler:
+    def __init__(self, frame_count=300, output_dir="logs/profiles", top_n=15):
+        self.frame_count = frame_count
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self.active = False
+
+        self.profiles = {}
+        self.trace_events = []
+        self.frame_times = {}
+        self.frames_left = 0
+        self.capture_name = None
+
+        self._origin = 0.0
+        self._frame_start = None
+        self._frame_state = None
+        self._previous_state = None
+        self._frame_index = 0
+
+    def start(self, frame_count=None):
+        if self.active:
+            return
+        self.active = True
+        self.frames_left = frame_count or self.frame_count
+        self.capture_name = time.strftime("profile_%Y%m%d_%H%M%S")
+        self.profiles = {}
+        self.frame_times = {}
+        self.trace_events = [
+            {"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "janken"}},
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": 1,
+                "tid": 1,
+                "args": {"name": "render"},
+            },
+        ]
+        self._origin = time.perf_counter()
+        self._previous_state = None
+        self._frame_index = 0
+        logger.info(f"Profiling the next {self.frames_left} frames")
+
+    def stop(self):
+        if not self.active:
+            return
+        self.active = False
+        if self._frame_start is not None:
+            self.profiles[self._frame_state].disable()
+            self._frame_start = None
+        self.save()
+
+    def toggle(self):
+        if self.active:
+            self.stop()
+        else:
+            self.start()
+
+    def _timestamp_us(self, at):
+        return (at - self._origin) * 1_000_000
+
+    def begin_frame(self, state):
+        if state != self._previous_state:
+            # notes: 状態の切り替わりをタイムライン上の目印として残す
+            self.trace_events.append(
+                {
+                    "name": state,
+                    "cat": "state",
+                    "ph": "i",
+                    "s": "p",
+                    "pid": 1,
+                    "tid": 1,
+                    "ts": self._timestamp_us(time.perf_counter()),
+                }
+            )
+            self._previous_state = state
+
+        profile = self.profiles.get(state)
+        if profile is None:
+            profile = cProfile.Profile()
+            self.profiles[state] = profile
+        self._frame_state = state
+        self._frame_start = time.perf_counter()
+        profile.enable()
+
+    def end_frame(self):
+        if self._frame_start is None:
+            return
+        self.profiles[self._frame_state].disable()
+        end = time.perf_counter()
+        duration = end - self._frame_start
+
+        self.trace_events.append(
+            {
+                "name": self._frame_state,
+                "cat": "frame",
+                "ph": "X",
+                "pid": 1,
+                "tid": 1,
+                "ts": self._timestamp_us(self._frame_start),
+                "dur": duration * 1_000_000,
+                "args": {"frame": self._frame_index},
+            }
+        )
+        count, total, longest = self.frame_times.get(self._frame_state, (0, 0.0, 0.0))
+        self.frame_times[self._frame_state] = (
+            count + 1,
+            total + duration,
+            max(longest, duration),
+        )
+        self._frame_start = None
+        self._frame_index += 1
+
+        self.frames_left -= 1
+        if self.frames_left <= 0:
+            self.stop()
+
+    # notes: 状態ごとの .prof、全体をまとめた .prof、Chrome/Perfetto で開けるトレースを書き出す
+    def save(self):
+        if not self.profiles:
+            logger.info("Profiling stopped before any frame was captured")
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        prefix = os.path.join(self.output_dir, self.capture_name)
+
+        combined = None
+        lines = [f"=== Profile {self.capture_name} ({self._frame_index} frames) ==="]
+        for state, profile in self.profiles.items():
+            profile.dump_stats(f"{prefix}_{state}.prof")
+            stats = pstats.Stats(profile)
+            if combined is None:
+                combined = pstats.Stats(profile)
+            else:
+                combined.add(stats)
+
+            count, total, longest = self.frame_times.get(state, (0, 0.0, 0.0))
+            lines.append(
+                f"[{state}] {count} frames, avg {total / max(count, 1) * 1000:.2f}ms,"
+                f" max {longest * 1000:.2f}ms"
+            )
+            buffer = io.StringIO()
+            stats.stream = buffer
+            stats.sort_stats("cumulative").print_stats(self.top_n)
+            lines.append(buffer.getvalue().strip())
+
+        combined.dump_stats(f"{prefix}.prof")
+        with open(f"{prefix}_trace.json", "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.trace_events, "displayTimeUnit": "ms"}, f)
+
+        lines.append(f"Profile written to {prefix}.prof and {prefix}_trace.json")
+        logger.info("\n".join(lines))
+        return prefix
@@ -0,0 +1,255 @@
+# src/gesture_classifier.py
+import json
+import os
+
+import numpy as np
+
+from src.common import logger
+
+WRIST = 0
+MIDDLE_MCP = 9
+
+
+# notes: ランドマークを手首基準・手のひらの大きさ基準に正規化した特徴量に変換する
+# 入力は (21, 2) または (N, 21, 2)
+def landmarks_to_features(landmarks):
+    points = np.asarray(landmarks, dtype=np.float32)[..., :2]
+    single = points.ndim == 2
+    if single:
+        points = points[np.newaxis]
+
+    points = points - points[:, WRIST : WRIST + 1]
+    scale = np.linalg.norm(points[:, MIDDLE_MCP], axis=1)
+    scale = np.where(scale > 1e-6, scale, 1.0)
+    features = (points / scale[:, np.newaxis, np.newaxis]).reshape(len(points), -1)
+
+    return features[0] if single else features
+
+
+# notes: 記録済みランドマークデータ（JSONL）を読み込む
+# 1行1フレームで {"label": "rock", "landmarks": [[x, y], ...]} の形式
+def load_landmark_records(path):
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            records.append(json.loads(line))
+    return records
+
+
+def confusion_matrix(true_labels, predicted_labels, labels):
+    lookup = {label: i for i, label in enumerate(labels)}
+    matrix = np.zeros((len(labels), len(labels)), dtype=np.int64)
+    for true_label, predicted in zip(true_labels, predicted_labels):
+        matrix[lookup[true_label], lookup[predicted]] += 1
+    return matrix
+
+
+def format_confusion_matrix(matrix, labels):
+    width = max(8, max(len(label) for label in labels) + 1)
+    lines = [" " * width + "".join(f"{label:>{width}}" for label in labels)]
+    for label, row in zip(labels, matrix):
+        lines.append(
+            f"{label:<{width}}" + "".join(f"{count:>{width}}" for count in row)
+        )
+    return "\n".join(lines)
+
+
+# notes: ゲーム中のランドマークをラベル付きで記録するクラス（学習データ作成用）
+class LandmarkRecorder:
+    def __init__(self, path):
+        path_dir = os.path.dirname(path)
+        if path_dir:
+            os.makedirs(path_dir, exist_ok=True)
+        self.file = open(path, "a", encoding="utf-8")
+        self.label = None
+
+    def record(self, landmarks, timestamp):
+        if self.label is None:
+            return
+        self.file.write(
+            json.dumps(
+                {
+                    "t": round(timestamp, 4),
+                    "label": self.label,
+                    "landmarks": [[round(x, 5), round(y, 5)] for x, y in landmarks],
+                }
+            )
+            + "\n"
+        )
+
+    def close(self):
+        self.file.close()
+
+
+# notes: 従来の閾値ルールによる判定をバックエンドとして扱うためのラッパー
+class RuleGestureClassifier:
+    name = "rules"
+    buffer_size = 5
+
+    def __init__(self, detector):
+        self.detector = detector
+
+    def classify(self, landmarks):
+        return self.detector.detect_gesture_detailed(landmarks)
+
+
+# notes: 多クラスロジスティック回帰（ソフトマックス）による分類器
+# 推論は正規化した特徴量に対する行列演算1回のみ
+class LogisticGestureClassifier:
+    name = "logistic"
+    buffer_size = 3
+
+    def __init__(self, labels=None, weights=None, bias=None, mean=None, std=None):
+        self.labels = list(labels) if labels is not None else []
+        self.weights = weights
+        self.bias = bias
+        self.mean = mean
+        self.std = std
+        self.min_confidence = 0.6
+
+    def fit(self, features, labels, epochs=500, learning_rate=0.5, l2=1e-3):
+        self.labels = sorted(set(labels.tolist()))
+        index = {label: i for i, label in enumerate(self.labels)}
+        targets = np.zeros((len(labels), len(self.labels)), dtype=np.float32)
+        targets[np.arange(len(labels)), [index[label] for label in labels]] = 1.0
+
+        self.mean = features.mean(axis=0)
+        self.std = features.std(axis=0) + 1e-6
+        x = (features - self.mean) / self.std
+
+        self.weights = np.zeros((x.shape[1], len(self.labels)), dtype=np.float32)
+        self.bias = np.zeros(len(self.labels), dtype=np.float32)
+        for _ in range(epochs):
+            probs = self._softmax(x @ self.weights + self.bias)
+            grad = (probs - targets) / len(x)
+            self.weights -= learning_rate * (x.T @ grad + l2 * self.weights)
+            self.bias -= learning_rate * grad.sum(axis=0)
+        return self
+
+    @staticmethod
+    def _softmax(logits):
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def predict_proba(self, features):
+        return self._softmax(
+            ((features - self.mean) / self.std) @ self.weights + self.bias
+        )
+
+    def predict(self, features):
+        return np.array(self.labels)[self.predict_proba(features).argmax(axis=1)]
+
+    def classify(self, landmarks):
+        probs = self.predict_proba(landmarks_to_features(landmarks))
+        best = int(probs.argmax())
+        if probs[best] < self.min_confidence:
+            return "unknown"
+        return self.labels[best]
+
+    def save(self, path):
+        np.savez(
+            path,
+            kind=self.name,
+            labels=np.array(self.labels),
+            weights=self.weights,
+            bias=self.bias,
+            mean=self.mean,
+            std=self.std,
+        )
+
+    @classmethod
+    def from_arrays(cls, data):
+        return cls(
+            labels=data["labels"].tolist(),
+            weights=data["weights"],
+            bias=data["bias"],
+            mean=data["mean"],
+            std=data["std"],
+        )
+
+
+# notes: 事前計算した特徴量インデックスに対するk近傍法による分類器
+# 距離計算は ||a||^2 - 2ab + ||b||^2 の形で行列演算1回にまとめる
+class KNNGestureClassifier:
+    name = "knn"
+    buffer_size = 3
+
+    def __init__(self, labels=None, index=None, index_labels=None, k=5):
+        self.labels = list(labels) if labels is not None else []
+        self.index = index
+        self.index_labels = index_labels
+        self.k = k
+        self.min_confidence = 0.6
+        self._index_norms = None if index is None else (index**2).sum(axis=1)
+
+    def fit(self, features, labels):
+        self.labels = sorted(set(labels.tolist()))
+        lookup = {label: i for i, label in enumerate(self.labels)}
+        self.index = features.astype(np.float32)
+        self.index_labels = np.array(
+            [lookup[label] for label in labels], dtype=np.int32
+        )
+        self._index_norms = (self.index**2).sum(axis=1)
+        return self
+
+    def _votes(self, features):
+        distances = (
+            self._index_norms[np.newaxis]
+            - 2 * features @ self.index.T
+            + (features**2).sum(axis=1, keepdims=True)
+        )
+        k = min(self.k, len(self.index))
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        votes = np.zeros((len(features), len(self.labels)), dtype=np.float32)
+        for i in range(k):
+            votes[np.arange(len(features)), self.index_labels[nearest[:, i]]] += 1
+        return votes / k
+
+    def predict(self, features):
+        return np.array(self.labels)[self._votes(features).argmax(axis=1)]
+
+    def classify(self, landmarks):
+        votes = self._votes(landmarks_to_features(landmarks)[np.newaxis])[0]
+        best = int(votes.argmax())
+        if votes[best] < self.min_confidence:
+            return "unknown"
+        return self.labels[best]
+
+    def save(self, path):
+        np.savez(
+            path,
+            kind=self.name,
+            labels=np.array(self.labels),
+            index=self.index,
+            index_labels=self.index_labels,
+            k=self.k,
+        )
+
+    @classmethod
+    def from_arrays(cls, data):
+        return cls(
+            labels=data["labels"].tolist(),
+            index=data["index"],
+            index_labels=data["index_labels"],
+            k=int(data["k"]),
+        )
+
+
+MODEL_TYPES = {
+    LogisticGestureClassifier.name: LogisticGestureClassifier,
+    KNNGestureClassifier.name: KNNGestureClassifier,
+}
+
+
+def load_gesture_model(path):
+    with np.load(path) as data:
+        kind = str(data["kind"])
+        if kind not in MODEL_TYPES:
+            raise ValueError(f"Unknown gesture model type: {kind}")
+        model = MODEL_TYPES[kind].from_arrays(data)
+    logger.info(f"Loaded {kind} gesture model from {path} ({model.labels})")
+    return model
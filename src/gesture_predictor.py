@@ -0,0 +1,199 @@
+# src/gesture_predictor.py
+import json
+import os
+from collections import deque
+
+import numpy as np
+
+from src.common import logger
+
+# notes: 指ごとの (先端, 第2関節, 付け根, 伸びていると判断する比率)
+# 比率は HandGestureDetector の is_finger_extended / is_thumb_extended と同じ基準
+FINGERS = [
+    (4, 3, 1, 1.3),
+    (8, 6, 5, 1.2),
+    (12, 10, 9, 1.2),
+    (16, 14, 13, 1.2),
+    (20, 18, 17, 1.2),
+]
+TIPS = [finger[0] for finger in FINGERS]
+PIPS = [finger[1] for finger in FINGERS]
+BASES = [finger[2] for finger in FINGERS]
+THRESHOLDS = np.array([finger[3] for finger in FINGERS])
+
+# notes: 各ジェスチャーで指が伸びているか（None は判定に使わない）
+GESTURE_PATTERNS = {
+    "rock": (False, False, False, False, False),
+    "paper": (True, True, True, True, True),
+    "scissors": (None, True, True, False, False),
+}
+
+
+# notes: 直近のフレームの指の曲がり具合の変化から、手が落ち着いたときのジェスチャーを予測するクラス
+# 指ごとの伸び率の推移を最小二乗で直線に当てはめ、horizon 秒後の値で判定する
+# 手全体が大きく動いている間は確信度を下げる
+class GesturePredictor:
+    def __init__(
+        self,
+        history=6,
+        min_frames=3,
+        horizon=0.1,
+        threshold=0.8,
+        margin_scale=0.15,
+        speed_scale=1.0,
+        max_gap=0.1,
+    ):
+        self.min_frames = min_frames
+        self.horizon = horizon
+        self.threshold = threshold
+        self.margin_scale = margin_scale
+        self.speed_scale = speed_scale
+        self.max_gap = max_gap
+        self.times = deque(maxlen=history)
+        self.ratios = deque(maxlen=history)
+        self.wrists = deque(maxlen=history)
+
+    def reset(self):
+        self.times.clear()
+        self.ratios.clear()
+        self.wrists.clear()
+
+    @staticmethod
+    def extension_ratios(points):
+        tips = points[TIPS]
+        pips = points[PIPS]
+        bases = points[BASES]
+        tip_distance = np.linalg.norm(tips - bases, axis=1)
+        pip_distance = np.linalg.norm(pips - bases, axis=1)
+        return tip_distance / np.maximum(pip_distance, 1e-6)
+
+    # notes: 確信度が閾値を超えた場合だけ (ジェスチャー, 確信度) を返す
+    def update(self, landmarks, timestamp):
+        points = np.asarray(landmarks, dtype=np.float64)[:, :2]
+        # notes: 間が空いたフレームは同じ動きの続きとはみなさない
+        if self.times and timestamp - self.times[-1] > self.max_gap:
+            self.reset()
+        self.times.append(timestamp)
+        self.ratios.append(self.extension_ratios(points))
+        self.wrists.append(points[0])
+        if len(self.times) < self.min_frames:
+            return None
+
+        times = np.array(self.times)
+        centered = times - times.mean()
+        spread = float(centered @ centered)
+        if spread <= 0.0:
+            return None
+        ratios = np.array(self.ratios)
+        slopes = centered @ (ratios - ratios.mean(axis=0)) / spread
+        forecast = ratios.mean(axis=0) + slopes * (
+            times[-1] - times.mean() + self.horizon
+        )
+        wrist_velocity = centered @ (np.array(self.wrists) - np.mean(self.wrists, 0))
+        speed = float(np.linalg.norm(wrist_velocity / spread))
+
+        extended = forecast > THRESHOLDS
+        certainty = np.tanh(np.abs(forecast - THRESHOLDS) / self.margin_scale)
+        damping = 1.0 / (1.0 + speed / self.speed_scale)
+
+        best = None
+        best_confidence = 0.0
+        for gesture, pattern in GESTURE_PATTERNS.items():
+            confidence = 1.0
+            for finger, expected in enumerate(pattern):
+                if expected is None:
+                    continue
+                if extended[finger] != expected:
+                    confidence = 0.0
+                    break
+                confidence = min(confidence, float(certainty[finger]))
+            if confidence > best_confidence:
+                best = gesture
+                best_confidence = confidence
+        best_confidence *= damping
+        if best is None or best_confidence < self.threshold:
+            return None
+        return best, best_confidence
+
+
+# notes: 予測と、その後に平滑化で確定したジェスチャーをJSONLで記録するクラス
+# 手が変わった予測はすべて記録し、ラウンドで最初の予測（手を確定させたもの）には first を付ける
+class PredictionLog:
+    def __init__(self, path=None):
+        self.file = None
+        if path:
+            path_dir = os.path.dirname(path)
+            if path_dir:
+                os.makedirs(path_dir, exist_ok=True)
+            self.file = open(path, "a", encoding="utf-8")
+        self.total = 0
+        self.correct = 0
+        self.unsettled = 0
+        self.rounds = 0
+        self.settled_rounds = 0
+        self.first_correct = 0
+        self.credited = 0
+        self.saved_total = 0.0
+
+    # notes: 時刻は DETECT の開始からの秒数
+    # saved は最初の予測が正しかった場合に、反応時間が平滑化での確定よりどれだけ早まったか
+    def record_round(self, session_id, round_number, predictions, settled, settled_at):
+        self.rounds += 1
+        first_at = predictions[0][2]
+        saved = None if settled_at is None else settled_at - first_at
+        if settled is None:
+            self.unsettled += len(predictions)
+        else:
+            self.settled_rounds += 1
+            if predictions[0][0] == settled:
+                self.first_correct += 1
+            # notes: 確定させた最初の予測が正しかった場合だけ、反応時間が早まった分として数える
+            # （外れた場合は確定したフレームで反応時間を測り直すので短縮にならない）
+            if predictions[0][0] == settled:
+                self.credited += 1
+                self.saved_total += saved
+        for index, (gesture, confidence, predicted_at) in enumerate(predictions):
+            correct = settled == gesture
+            self.total += 1
+            if correct:
+                self.correct += 1
+            if self.file:
+                entry = {
+                    "session": session_id,
+                    "round": round_number,
+                    "first": index == 0,
+                    "predicted": gesture,
+                    "confidence": round(confidence, 3),
+                    "predicted_at": round(predicted_at, 4),
+                    "settled": settled,
+                    "settled_at": None if settled_at is None else round(settled_at, 4),
+                    "saved": (
+                        round(saved, 4)
+                        if saved is not None and index == 0 and correct
+                        else None
+                    ),
+                    "correct": correct,
+                }
+                self.file.write(json.dumps(entry) + "\n")
+        if self.file:
+            self.file.flush()
+
+    def summary(self):
+        settled = self.total - self.unsettled
+        accuracy = self.correct / settled if settled else 0.0
+        first_accuracy = (
+            self.first_correct / self.settled_rounds if self.settled_rounds else 0.0
+        )
+        saved = self.saved_total / self.credited if self.credited else 0.0
+        return (
+            f"Predictions: {self.total} in {self.rounds} rounds"
+            f" ({self.unsettled} never settled), accuracy {accuracy:.1%} of settled,"
+            f" first guess {first_accuracy:.1%},"
+            f" mean latency saved when the commit was right {saved * 1000:.0f}ms"
+        )
+
+    def close(self):
+        if self.total:
+            logger.info(self.summary())
+        if self.file:
+            self.file.close()
@@ -1,7 +1,9 @@
 # src/janken_game.py
 import math
+import os
 import random
 import time
+import uuid
 import warnings
 
 import cv2
@@ -12,39 +14,203 @@ from OpenGL.GLUT import *
 from OpenGL.GLUT import GLUT_BITMAP_HELVETICA_18
 from pygame.locals import *
 
+from src.alloc_profiler import AllocationProfiler
+from src.audio_cues import AudioCues, pre_init_mixer
+from src.broadcast import StatePublisher
 from src.common import logger
 from src.detector import HandGestureDetector
+from src.frame_bus import FrameBus
+from src.frame_pacing import DetectionWorker, FramePacer, LatencyTracker
+from src.frame_profiler import FrameProfiler
+from src.gesture_classifier import LandmarkRecorder
+from src.gesture_predictor import GesturePredictor, PredictionLog
+from src.landmark_overlay import LandmarkOverlay
+from src.metrics_exporter import MetricsExporter, StageTimings
 from src.particle import ParticleSystem
+from src.presence_gate import PresenceGate
+from src.quality_governor import QualityGovernor
+from src.reaction_stats import ReactionStatsEngine
+from src.render_target import RenderTarget
+from src.scheduler import MonotonicClock, TimerScheduler
+from src.score_store import ScoreStore
+from src.video_recorder import RoundRecorder, ScenePixelReader
 
 warnings.filterwarnings("ignore")
 warnings.simplefilter("ignore")
 
 
 class JankenGame:
-    def __init__(self):
-        self.cap = cv2.VideoCapture(0)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    # notes: headless=True の場合はカメラ・ウィンドウ・OpenGLを初期化しない（シミュレーター用）
+    def __init__(self, clock=None, headless=False):
+        self.clock = clock or MonotonicClock()
+        self.scheduler = TimerScheduler(self.clock)
+        self.headless = headless
+
+        # notes: ウィンドウサイズと内部解像度（RENDER_SCALE=auto の場合は品質レベルに合わせて変える）
+        self.window_size = (
+            int(os.getenv("WINDOW_WIDTH", "1400")),
+            int(os.getenv("WINDOW_HEIGHT", "1000")),
+        )
+        render_scale = os.getenv("RENDER_SCALE", "auto")
+        self.fixed_render_scale = (
+            None if render_scale == "auto" else float(render_scale)
+        )
+        self.render_target = None
+
+        # notes: 効果音（ヘッドレスでは既定で無効、有効にした場合はダミーのオーディオドライバを使う）
+        audio_enabled = os.getenv("AUDIO_CUES", "0" if headless else "1") == "1"
+        audio_rate = int(os.getenv("AUDIO_SAMPLE_RATE", "44100"))
+        audio_buffer = int(os.getenv("AUDIO_BUFFER_SIZE", "256"))
+        if audio_enabled and headless:
+            os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+        self.cap = None
+        self.frame_bus = None
+        if not headless:
+            self.cap = cv2.VideoCapture(0)
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            # notes: キャプチャしたフレームはリングのバッファに一度だけ書き込み、検出・プレビュー・録画で共有する
+            self.frame_bus = FrameBus(
+                int(os.getenv("FRAME_BUS_RING_SIZE", "4")),
+                max_buffers=int(os.getenv("FRAME_BUS_MAX_BUFFERS", "16")),
+            )
 
-        pygame.init()
-        self.screen = pygame.display.set_mode((1400, 1000), DOUBLEBUF | OPENGL)
-        pygame.display.set_caption("Reflex Rock Paper Scissors")
+            if audio_enabled:
+                pre_init_mixer(audio_rate, audio_buffer)
+            pygame.init()
+            self.screen = pygame.display.set_mode(self.window_size, DOUBLEBUF | OPENGL)
+            pygame.display.set_caption("Reflex Rock Paper Scissors")
 
-        glEnable(GL_DEPTH_TEST)
-        glMatrixMode(GL_PROJECTION)
-        gluPerspective(45, 1400 / 1000, 0.1, 50.0)
-        glMatrixMode(GL_MODELVIEW)
+            width, height = self.window_size
+            glEnable(GL_DEPTH_TEST)
+            glMatrixMode(GL_PROJECTION)
+            gluPerspective(45, width / height, 0.1, 50.0)
+            glMatrixMode(GL_MODELVIEW)
 
-        pygame.font.init()
-        self.font_large = pygame.font.Font(None, 72)
-        self.font_medium = pygame.font.Font(None, 48)
-        self.font_small = pygame.font.Font(None, 36)
+            self.render_target = RenderTarget(
+                self.window_size, scale=self.fixed_render_scale or 1.0
+            )
+
+            pygame.font.init()
+            self.font_large = pygame.font.Font(None, 72)
+            self.font_medium = pygame.font.Font(None, 48)
+            self.font_small = pygame.font.Font(None, 36)
+
+        self.audio_cues = None
+        if audio_enabled:
+            self.audio_cues = AudioCues(
+                self.clock,
+                sample_rate=audio_rate,
+                buffer_size=audio_buffer,
+                volume=float(os.getenv("AUDIO_VOLUME", "0.5")),
+            )
 
         self.particle_system = ParticleSystem()
-        self.hand_detector = HandGestureDetector()
+        self.hand_detector = HandGestureDetector(use_mediapipe=not headless)
 
         self.camera_texture = None
 
+        # notes: ランドマークはフレームに描き込まず、カメラ映像の上にGPUで重ね描きする
+        self.landmark_overlay = None if headless else LandmarkOverlay()
+        self.player_skeleton = os.getenv("PLAYER_SKELETON", "0") == "1"
+
+        # notes: 指の動きから平滑化で確定する前のジェスチャーを予測して早めに確定させる
+        self.gesture_predictor = None
+        self.prediction_log = None
+        self.round_predictions = []
+        self.committed_gesture = None
+        self.prediction_settled = False
+        if os.getenv("PREDICTIVE_COMMIT", "0") == "1":
+            self.gesture_predictor = GesturePredictor(
+                threshold=float(os.getenv("PREDICTION_THRESHOLD", "0.8"))
+            )
+            self.prediction_log = PredictionLog(
+                os.getenv("PREDICTION_LOG_PATH", "logs/predictions.jsonl")
+            )
+
+        record_path = os.getenv("LANDMARK_RECORD_PATH")
+        self.landmark_recorder = LandmarkRecorder(record_path) if record_path else None
+        self.record_labels = {
+            pygame.K_1: "rock",
+            pygame.K_2: "paper",
+            pygame.K_3: "scissors",
+            pygame.K_4: "unknown",
+        }
+
+        self.target_fps = 60
+        self.frame_index = 0
+        self.preview_scale = 1.0
+        self.draw_landmarks = True
+        self.inference_interval = 1
+        self.quality_governor = QualityGovernor(
+            target_fps=self.target_fps, on_change=self.apply_quality_settings
+        )
+        self.quality_governor.set_level(int(os.getenv("QUALITY_LEVEL", "0")))
+
+        # notes: 低遅延モードでは推論を別スレッドで行い、描画直前に最新の結果を取り込む
+        self.low_latency = not headless and os.getenv("LOW_LATENCY_MODE", "0") == "1"
+        self.frame_pacer = FramePacer(self.target_fps) if self.low_latency else None
+        self.detection_worker = (
+            DetectionWorker(self.hand_detector.hands) if self.low_latency else None
+        )
+        self.latency_tracker = LatencyTracker()
+
+        # notes: ラウンドごとのリプレイ録画（RECORD_DIR が設定されている場合のみ）
+        record_dir = os.getenv("RECORD_DIR")
+        self.round_recorder = None
+        self.scene_reader = None
+        if record_dir and not headless:
+            self.round_recorder = RoundRecorder(
+                record_dir,
+                fps=int(os.getenv("RECORD_FPS", "30")),
+                source_fps=self.target_fps,
+                drop_policy=os.getenv("RECORD_DROP_POLICY", "oldest"),
+                frame_bus=self.frame_bus,
+            )
+            if os.getenv("RECORD_SCENE", "0") == "1":
+                self.scene_reader = ScenePixelReader(
+                    *self.screen.get_size(),
+                    max_frames=self.round_recorder.max_queue + 2,
+                )
+
+        # notes: 手が写っていないフレームではMediaPipeの推論を省略する前段のゲート
+        self.presence_gate = None
+        if os.getenv("PRESENCE_GATE", "0") == "1":
+            self.presence_gate = PresenceGate(
+                motion_threshold=float(os.getenv("PRESENCE_MOTION_THRESHOLD", "3.0")),
+                skin_ratio_threshold=float(os.getenv("PRESENCE_SKIN_RATIO", "0.03")),
+            )
+
+        self.alloc_profiler = AllocationProfiler(
+            report_path=os.getenv("ALLOC_PROFILE_REPORT_PATH") or None,
+            state_snapshots=os.getenv("ALLOC_PROFILE_SNAPSHOTS", "1") == "1",
+            count_interval=int(os.getenv("ALLOC_PROFILE_COUNT_INTERVAL", "30")),
+        )
+        if os.getenv("ALLOC_PROFILE", "0") == "1":
+            self.alloc_profiler.start()
+
+        # notes: 現地で重くなったときに決まったフレーム数だけ cProfile を取るためのプロファイラ
+        self.frame_profiler = FrameProfiler(
+            frame_count=int(os.getenv("PROFILE_FRAMES", "300")),
+            output_dir=os.getenv("PROFILE_DIR", "logs/profiles"),
+        )
+        if os.getenv("PROFILE_CAPTURE", "0") == "1":
+            self.frame_profiler.start()
+
+        # notes: セカンドスクリーン向けの状態配信（BROADCAST_PORT が設定されている場合のみ）
+        self.latest_landmarks = None
+        broadcast_port = os.getenv("BROADCAST_PORT")
+        self.state_publisher = None
+        if broadcast_port:
+            self.state_publisher = StatePublisher(
+                host=os.getenv("BROADCAST_HOST", "127.0.0.1"),
+                port=int(broadcast_port),
+                include_landmarks=os.getenv("BROADCAST_LANDMARKS", "0") == "1",
+            )
+        self.latched_sequence = None
+        self.latched_capture_time = None
+
         self.game_states = ["MENU", "COUNTDOWN", "SHOW_HANDS", "DETECT", "RESULT"]
         self.current_state = "MENU"
         self.round_count = 0
@@ -52,7 +218,7 @@ class JankenGame:
         self.computer_wins = 0
         self.draws = 0
 
-        self.state_start_time = time.time()
+        self.state_start_time = self.clock.now()
         self.countdown_numbers = [3, 2, 1]
         self.countdown_index = 0
 
@@ -72,6 +238,40 @@ class JankenGame:
         self.reaction_start_time = None
         self.reaction_time = None
 
+        self.player_id = os.getenv("PLAYER_ID", "guest")
+        self.session_id = uuid.uuid4().hex
+        self.round_started_at = None
+        self.score_store = ScoreStore(os.getenv("SCORE_DB_PATH", "data/janken.sqlite3"))
+
+        self.reaction_stats_path = os.getenv(
+            "REACTION_STATS_PATH", "data/reaction_stats.json"
+        )
+        self.reaction_stats = ReactionStatsEngine.load(self.reaction_stats_path)
+        self.reaction_summary = self.reaction_stats.summary(self.player_id)
+
+        # notes: 監視用のメトリクス（METRICS_PORT か METRICS_FILE が設定されている場合のみ公開）
+        self.stage_timings = StageTimings()
+        self.frames_rendered = 0
+        self.frames_over_budget = 0
+        self.present_started_at = None
+        self.inference_count = 0
+        self.interval_skipped_frames = 0
+        self.rounds_played = 0
+        self.result_counts = {"win": 0, "lose": 0, "draw": 0}
+        self.metrics_interval = float(os.getenv("METRICS_INTERVAL", "1.0"))
+        self.metrics_published_at = time.perf_counter()
+        self.metrics_previous_counts = (0, 0)
+        metrics_port = os.getenv("METRICS_PORT")
+        metrics_file = os.getenv("METRICS_FILE")
+        self.metrics_exporter = None
+        if metrics_port or metrics_file:
+            self.metrics_exporter = MetricsExporter(
+                host=os.getenv("METRICS_HOST", "127.0.0.1"),
+                port=int(metrics_port) if metrics_port else None,
+                file_path=metrics_file or None,
+                file_interval=float(os.getenv("METRICS_FILE_INTERVAL", "5.0")),
+            )
+
     def judge_winner(self, player, computer):
         if player == computer:
             return "draw"
@@ -84,23 +284,88 @@ class JankenGame:
         else:
             return "lose"
 
-    def process_frame(self, frame):
+    # notes: 品質ガバナーが決めた設定を各コンポーネントに反映するメソッド
+    def apply_quality_settings(self, settings):
+        self.particle_system.effect_scale = settings["particle_scale"]
+        self.particle_system.max_particles = settings["max_particles"]
+        self.preview_scale = settings["preview_scale"]
+        self.draw_landmarks = settings["draw_landmarks"]
+        self.inference_interval = settings["inference_interval"]
+        if self.render_target and self.fixed_render_scale is None:
+            self.render_target.set_scale(settings["render_scale"])
+
+    @property
+    def quality_level(self):
+        return self.quality_governor.settings["name"]
+
+    def process_frame(self, frame, captured_at=None, slot=None):
+        self.frame_index += 1
+        if self.frame_index % self.inference_interval:
+            self.interval_skipped_frames += 1
+            return frame
+
+        captured_at = self.clock.now() if captured_at is None else captured_at
+        # notes: ゲートで推論を省略した場合は、手が見つからなかったときと同じ扱いにする
+        if self.presence_gate and not self.presence_gate.should_infer(frame):
+            self.apply_detection(None, captured_at)
+            self.latched_capture_time = captured_at
+            return frame
+
+        if self.detection_worker:
+            self.detection_worker.submit(frame, captured_at, slot)
+            return frame
+
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         results = self.hand_detector.hands.process(rgb_frame)
+        self.inference_count += 1
+        if self.presence_gate:
+            self.presence_gate.mark_result(bool(results.multi_hand_landmarks))
+        self.apply_detection(results.multi_hand_landmarks, captured_at)
+        self.latched_capture_time = captured_at
+
+        return frame
+
+    # notes: 推論スレッドの最新の結果を取り込むメソッド（低遅延モード用）
+    def latch_detection(self):
+        result = self.detection_worker.latest()
+        if result is None or result.sequence == self.latched_sequence:
+            return
+        self.latched_sequence = result.sequence
+        self.latched_capture_time = result.captured_at
+        if self.presence_gate:
+            self.presence_gate.mark_result(bool(result.multi_hand_landmarks))
+        self.apply_detection(result.multi_hand_landmarks, result.captured_at)
+
+    # notes: 手のランドマークの検出結果からプレイヤーの手と反応時間を更新するメソッド
+    # 反応時間は判定に使ったフレームのキャプチャ時刻で計算する
+    def apply_detection(self, multi_hand_landmarks, captured_at):
+        # notes: 合図が表示される前にキャプチャしたフレームは、遷移後に届いても反応時間の計算に使わない
+        if self.current_state == "DETECT" and (
+            self.reaction_start_time is None or captured_at < self.reaction_start_time
+        ):
+            return
 
         previous_gesture = self.player_gesture
         self.player_gesture = None
+        self.latest_landmarks = None
 
-        if results.multi_hand_landmarks:
-            for hand_landmarks in results.multi_hand_landmarks:
-                self.hand_detector.mp_drawing.draw_landmarks(
-                    frame, hand_landmarks, self.hand_detector.mp_hands.HAND_CONNECTIONS
-                )
+        if multi_hand_landmarks:
+            for hand_landmarks in multi_hand_landmarks:
+                if self.landmark_overlay:
+                    self.landmark_overlay.set_landmarks(
+                        [(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]
+                    )
                 landmarks = []
                 for lm in hand_landmarks.landmark:
                     landmarks.append([lm.x, lm.y])
 
+                self.latest_landmarks = landmarks
+                if self.landmark_recorder:
+                    self.landmark_recorder.record(landmarks, time.time())
+
                 gesture = self.hand_detector.detect_gesture(landmarks)
+                if self.gesture_predictor and self.current_state == "DETECT":
+                    gesture = self.predict_gesture(landmarks, gesture, captured_at)
                 if gesture != "unknown":
                     self.player_gesture = gesture
 
@@ -109,14 +374,60 @@ class JankenGame:
                         and previous_gesture is None
                         and self.reaction_start_time is not None
                     ):
-                        self.reaction_time = time.time() - self.reaction_start_time
+                        self.reaction_time = captured_at - self.reaction_start_time
         else:
             self.hand_detector.gesture_buffer = []
-
-        return frame
+            if self.landmark_overlay:
+                self.landmark_overlay.set_landmarks(None)
+            if self.gesture_predictor:
+                self.gesture_predictor.reset()
+            # notes: 先読みで確定した手は、手が一瞬見えなくなっても取り消さない
+            if self.committed_gesture:
+                self.player_gesture = self.committed_gesture
+
+    # notes: 平滑化で確定するまでは予測を使い、確定したらそれまでの予測をすべて突き合わせて記録する
+    # 最初に確定した予測は平滑化で確定するまで保持し、後の予測は記録するだけで手を切り替えない
+    # 平滑化で確定した手が予測と違った場合は、外れた予測の時刻ではなく確定したフレームで反応時間を測り直す
+    def predict_gesture(self, landmarks, settled, captured_at):
+        prediction = self.gesture_predictor.update(landmarks, captured_at)
+        elapsed = captured_at - self.reaction_start_time
+        if settled != "unknown":
+            if self.round_predictions:
+                self.prediction_log.record_round(
+                    self.session_id,
+                    self.round_count + 1,
+                    self.round_predictions,
+                    settled,
+                    elapsed,
+                )
+                self.round_predictions = []
+            if not self.prediction_settled and self.committed_gesture not in (
+                None,
+                settled,
+            ):
+                self.reaction_time = elapsed
+            self.prediction_settled = True
+            self.committed_gesture = settled
+            return settled
+        if prediction is not None and not self.prediction_settled:
+            gesture, confidence = prediction
+            last = self.round_predictions[-1][0] if self.round_predictions else None
+            if gesture != last:
+                self.round_predictions.append((gesture, confidence, elapsed))
+            if self.committed_gesture is None:
+                self.committed_gesture = gesture
+        return self.committed_gesture or settled
 
     # notes: カメラの映像をOpenGLのテクスチャとして作成するメソッド
     def create_camera_texture(self, frame):
+        if self.preview_scale < 1.0:
+            frame = cv2.resize(
+                frame,
+                None,
+                fx=self.preview_scale,
+                fy=self.preview_scale,
+                interpolation=cv2.INTER_AREA,
+            )
         frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         frame_rgb = cv2.flip(frame_rgb, 0)
 
@@ -222,69 +533,120 @@ class JankenGame:
 
         glPopMatrix()
 
+    # notes: 締め切りを過ぎた状態遷移を発火させるメソッド
+    # 各遷移は予定時刻を起点に次の遷移を予約するため、フレームレートに関係なく各状態の長さが一定になる
+    # 1回の呼び出しで進む遷移は1つだけなので、処理が止まった後でもDETECTが1フレームも表示されずに終わることはない
     def update_game_state(self):
-        current_time = time.time()
-        elapsed = current_time - self.state_start_time
-
-        if self.current_state == "MENU":
-            pass
-
-        elif self.current_state == "COUNTDOWN":
-            if elapsed >= self.countdown_duration:
-                self.countdown_index += 1
-                self.state_start_time = current_time
-                self.particle_system.add_effect("countdown", 15)
-
-                if self.countdown_index >= len(self.countdown_numbers):
-                    self.show_hands()
-
-        elif self.current_state == "SHOW_HANDS":
-            if elapsed >= self.show_duration:
-                self.start_detection()
-
-        elif self.current_state == "DETECT":
-            if elapsed >= self.detect_duration:
-                if self.player_gesture:
-                    self.game_result = self.judge_winner(
-                        self.player_gesture, self.computer_gesture
-                    )
-                else:
-                    self.game_result = "lose"
-
-                self.show_result()
-
-        elif self.current_state == "RESULT":
-            if elapsed >= self.result_duration:
-                self.next_round()
-
-    def start_countdown(self):
+        fired = self.scheduler.run_due()
+        if self.audio_cues:
+            self.audio_cues.poll()
+        return fired
+
+    # notes: DETECTに入って最初に表示したフレームの時刻を反応時間の起点にする
+    # 遷移が遅れて発火したり描画に時間がかかったりしても、合図が画面に出る前の時間は反応時間に含めない
+    def mark_presented(self, presented_at):
+        if self.current_state == "DETECT" and self.reaction_start_time is None:
+            self.reaction_start_time = presented_at
+
+    # notes: 遷移が予定されていた時刻 at を渡して、音が出始めるまでの遅れを計測させる
+    def play_cue(self, name, at):
+        if self.audio_cues:
+            self.audio_cues.play(name, at)
+
+    def start_countdown(self, at=None):
+        at = self.clock.now() if at is None else at
+        self.scheduler.cancel_all()
         self.current_state = "COUNTDOWN"
-        self.state_start_time = time.time()
+        self.state_start_time = at
         self.countdown_index = 0
         self.computer_gesture = random.choice(self.gestures)
         self.player_gesture = None
         self.game_result = None
         self.reaction_time = None
+        self.round_started_at = time.time()
         self.particle_system.clear_particles()
 
         self.hand_detector.gesture_buffer = []
 
+        if self.round_recorder:
+            self.round_recorder.start_segment(
+                f"{self.session_id[:8]}_round{self.round_count + 1:04d}"
+            )
+            if self.scene_reader:
+                self.scene_reader.reset()
+
         logger.info(f"Round {self.round_count + 1} - Reflex Battle!")
+        self.play_cue("countdown", at)
+        self.scheduler.schedule_at(
+            at + self.countdown_duration, "COUNTDOWN_TICK", self.countdown_tick
+        )
 
-    def show_hands(self):
+    def countdown_tick(self, at):
+        self.countdown_index += 1
+        self.state_start_time = at
+        self.particle_system.add_effect("countdown", 15)
+
+        if self.countdown_index >= len(self.countdown_numbers):
+            self.show_hands(at)
+        else:
+            self.play_cue("countdown", at)
+            self.scheduler.schedule_at(
+                at + self.countdown_duration, "COUNTDOWN_TICK", self.countdown_tick
+            )
+
+    def show_hands(self, at=None):
+        at = self.clock.now() if at is None else at
         self.current_state = "SHOW_HANDS"
-        self.state_start_time = time.time()
+        self.state_start_time = at
         logger.info(f"Computer plays: {self.gesture_names[self.computer_gesture]}")
+        self.play_cue("show", at)
+        self.scheduler.schedule_at(
+            at + self.show_duration, "DETECT", self.start_detection
+        )
 
-    def start_detection(self):
+    def start_detection(self, at=None):
+        at = self.clock.now() if at is None else at
         self.current_state = "DETECT"
-        self.state_start_time = time.time()
-        self.reaction_start_time = time.time()
+        self.state_start_time = at
+        self.reaction_start_time = None
+        if self.gesture_predictor:
+            self.gesture_predictor.reset()
+            self.round_predictions = []
+            self.committed_gesture = None
+            self.prediction_settled = False
         logger.info("Quickly show your hand!")
+        self.play_cue("go", at)
+        self.scheduler.schedule_at(
+            at + self.detect_duration, "RESULT", self.finish_detection
+        )
+
+    def finish_detection(self, at):
+        if self.round_predictions:
+            self.prediction_log.record_round(
+                self.session_id,
+                self.round_count + 1,
+                self.round_predictions,
+                None,
+                None,
+            )
+            self.round_predictions = []
+        self.committed_gesture = None
+
+        if self.player_gesture:
+            self.game_result = self.judge_winner(
+                self.player_gesture, self.computer_gesture
+            )
+        else:
+            self.game_result = "lose"
+
+        self.show_result(at)
 
-    def show_result(self):
+    def show_result(self, at=None):
+        at = self.clock.now() if at is None else at
         self.current_state = "RESULT"
-        self.state_start_time = time.time()
+        self.state_start_time = at
+        self.scheduler.schedule_at(at + self.result_duration, "MENU", self.next_round)
+        self.play_cue(self.game_result, at)
 
         if self.game_result == "win":
             self.player_wins += 1
@@ -323,10 +685,30 @@ class JankenGame:
                 f"DRAW! Both played {self.gesture_names[self.computer_gesture]}{reaction_msg}"
             )
 
-    def next_round(self):
+        self.rounds_played += 1
+        self.result_counts[self.game_result] += 1
+
+        if self.reaction_time is not None:
+            self.reaction_stats.update(self.player_id, self.reaction_time)
+            self.reaction_summary = self.reaction_stats.summary(self.player_id)
+
+        self.score_store.record_round(
+            self.session_id,
+            self.player_id,
+            self.round_count + 1,
+            self.computer_gesture,
+            self.player_gesture,
+            self.game_result,
+            self.reaction_time,
+            self.round_started_at,
+        )
+
+    def next_round(self, at=None):
+        if self.round_recorder:
+            self.round_recorder.end_segment()
         self.round_count += 1
         self.current_state = "MENU"
-        self.state_start_time = time.time()
+        self.state_start_time = self.clock.now() if at is None else at
         logger.info(
             f"Score: You {self.player_wins} - {self.computer_wins} Computer (Draws: {self.draws})"
         )
@@ -338,10 +720,18 @@ class JankenGame:
         self.player_wins = 0
         self.computer_wins = 0
         self.draws = 0
-        self.state_start_time = time.time()
+        self.session_id = uuid.uuid4().hex
+        self.scheduler.cancel_all()
+        if self.round_recorder:
+            self.round_recorder.end_segment()
+        self.state_start_time = self.clock.now()
         self.particle_system.clear_particles()
 
-    def draw_scene(self):
+    # notes: 3Dシーンは内部解像度で描いてから拡大し、文字などのHUDはウィンドウの解像度で上に描く
+    def draw_scene(self, late_latch=None):
+        if self.render_target:
+            self.render_target.begin()
+
         if self.current_state == "COUNTDOWN":
             glClearColor(0.1, 0.1, 0.3, 1.0)
         elif self.current_state in ["SHOW_HANDS", "DETECT"]:
@@ -364,8 +754,6 @@ class JankenGame:
         self.particle_system.update()
         self.particle_system.draw()
 
-        self.draw_game_ui()
-
         if hasattr(self, "current_frame") and self.camera_texture:
             self.draw_camera_feed()
 
@@ -374,9 +762,22 @@ class JankenGame:
             and self.computer_gesture
         ):
             self.draw_computer_hand()
-        if self.player_gesture:
+
+        # notes: 低遅延モードでは、プレイヤーに関わる要素を描く直前に最新の推論結果を取り込む
+        if late_latch is not None:
+            late_latch()
+
+        if self.player_gesture or (
+            self.player_skeleton and self.landmark_overlay.visible
+        ):
             self.draw_player_hand()
 
+        if self.render_target:
+            self.render_target.end()
+
+        self.draw_game_ui()
+        self.draw_hand_labels()
+
     # notes: ゲームのUIを描画するメソッド
     # ゲームのスコア、ラウンド数、リアクションタイムなどを表示
     def draw_game_ui(self):
@@ -400,6 +801,17 @@ class JankenGame:
             for char in reaction_text:
                 glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18, ord(char))
 
+        if self.reaction_summary:
+            summary = self.reaction_summary
+            stats_text = (
+                f"BEST: {summary.best:.3f}s  MEDIAN: {summary.median:.3f}s"
+                f"  P90: {summary.p90:.3f}s  TOP {100 - summary.percentile_rank * 100:.0f}%"
+            )
+            glColor3f(1, 1, 0)
+            glRasterPos3f(-8, 8.5, -15)
+            for char in stats_text:
+                glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18, ord(char))
+
         if len(self.hand_detector.gesture_buffer) > 0:
             buffer_info = (
                 f"Detection Buffer: {'/'.join(self.hand_detector.gesture_buffer[-3:])}"
@@ -488,7 +900,7 @@ class JankenGame:
 
         elif self.current_state == "DETECT":
             glColor3f(1, 0, 0)
-            elapsed = time.time() - self.state_start_time
+            elapsed = self.clock.now() - self.state_start_time
             remaining = self.detect_duration - elapsed
             msg = f"Show your hand quickly! ({remaining:.1f}s)"
             glRasterPos3f(-4, -6, -15)
@@ -532,9 +944,13 @@ class JankenGame:
             glVertex3f(-9, 6.25, -15)
             glEnd()
 
+            # notes: 映像の少し手前に重ねて、四角形とのZファイティングを避ける
+            if self.draw_landmarks and self.landmark_overlay:
+                self.landmark_overlay.draw_on_quad(-9, 6.25, -14.95, 6, 4.5)
+
     # notes: コンピューターの手を描画するメソッド
     def draw_computer_hand(self):
-        pulse = (math.sin(time.time() * 8) + 1) * 0.2 + 0.8
+        pulse = (math.sin(self.clock.now() * 8) + 1) * 0.2 + 0.8
         color = (
             (1.0, 0.7, 0.2) if self.current_state == "SHOW_HANDS" else (0.8, 0.8, 0.8)
         )
@@ -543,27 +959,274 @@ class JankenGame:
             self.computer_gesture, 4, 0, -15, scale=2.5 * pulse, color=color
         )
 
-        glColor3f(1, 0.7, 0.2)
-        glRasterPos3f(2, -4, -15)
-        label = f"COMPUTER: {self.gesture_names[self.computer_gesture]} {self.gesture_emojis[self.computer_gesture]}"
-        for char in label:
-            glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18, ord(char))
-
     # notes: プレイヤーの手を描画するメソッド
     def draw_player_hand(self):
         color = (0.2, 1.0, 0.2) if self.player_gesture else (0.5, 0.5, 0.5)
 
-        if self.player_gesture:
+        # notes: PLAYER_SKELETON=1 の場合は固定の手の形の代わりに検出したランドマークを立体で描く
+        if self.player_skeleton:
+            angle = math.sin(self.clock.now() * 0.8) * 25.0
+            self.landmark_overlay.draw_skeleton(
+                -4, -2, -15, scale=12.0, color=color, angle=angle
+            )
+        elif self.player_gesture:
             self.draw_3d_hand_model(
                 self.player_gesture, -4, -2, -15, scale=2.0, color=color
             )
 
+    # notes: 手の下に表示するラベル（HUDとしてウィンドウの解像度で描く）
+    def draw_hand_labels(self):
+        if (
+            self.current_state in ["SHOW_HANDS", "DETECT", "RESULT"]
+            and self.computer_gesture
+        ):
+            glColor3f(1, 0.7, 0.2)
+            glRasterPos3f(2, -4, -15)
+            label = f"COMPUTER: {self.gesture_names[self.computer_gesture]} {self.gesture_emojis[self.computer_gesture]}"
+            for char in label:
+                glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18, ord(char))
+
+        if self.player_gesture:
             glColor3f(0.2, 1.0, 0.2)
             glRasterPos3f(-7, -5, -15)
             label = f"YOU: {self.gesture_names[self.player_gesture]} {self.gesture_emojis[self.player_gesture]}"
             for char in label:
                 glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18, ord(char))
 
+    # notes: キー入力を処理するメソッド（終了する場合はFalseを返す）
+    def handle_key(self, key):
+        if key == pygame.K_ESCAPE:
+            return False
+        elif key == pygame.K_SPACE:
+            if self.current_state == "MENU":
+                self.start_countdown()
+        elif key == pygame.K_r:
+            self.reset_game()
+        elif key == pygame.K_c:
+            self.hand_detector.cycle_backend()
+        elif key == pygame.K_F9:
+            self.alloc_profiler.toggle()
+        elif key == pygame.K_F10:
+            self.frame_profiler.toggle()
+        elif self.landmark_recorder and key == pygame.K_0:
+            self.landmark_recorder.label = None
+            logger.info("Landmark recording paused")
+        elif self.landmark_recorder and key in self.record_labels:
+            self.landmark_recorder.label = self.record_labels[key]
+            logger.info(f"Recording landmarks as '{self.landmark_recorder.label}'")
+        return True
+
+    # notes: 1フレーム分の更新・キャプチャ・判定・描画を行うメソッド
+    def run_frame(self):
+        fired = self.update_game_state()
+
+        mark = time.perf_counter()
+        slot = self.frame_bus.capture(self.cap, self.clock)
+        mark = self.record_stage("capture", mark)
+        if slot:
+            # notes: キャプチャ中に締め切りを過ぎた遷移を先に反映してから判定する（遷移はフレームごとに1つまで）
+            if not fired:
+                self.update_game_state()
+            # notes: フレームは読み取り専用のバスのバッファで、次のキャプチャまではそのまま使える
+            # 次のキャプチャより後まで使う推論スレッドは slot を渡して参照を持たせる（録画はバスを購読している）
+            frame = slot.frame
+            self.current_frame = self.process_frame(frame, slot.captured_at, slot)
+            mark = self.record_stage("detect", mark)
+            self.create_camera_texture(frame)
+            mark = self.record_stage("upload", mark)
+
+        self.draw_scene(
+            late_latch=self.latch_detection if self.detection_worker else None
+        )
+        mark = self.record_stage("render", mark)
+
+        if self.round_recorder:
+            if self.scene_reader and self.round_recorder.wants_frame():
+                scene = self.scene_reader.read()
+                if scene is not None:
+                    self.round_recorder.submit("scene", scene.frame, scene)
+            self.round_recorder.advance()
+
+        # notes: flip は垂直同期で待つことがあるので、品質の判定に使う処理時間はその直前までで測る
+        self.present_started_at = time.perf_counter()
+        pygame.display.flip()
+        self.record_stage("present", mark)
+        self.mark_presented(self.clock.now())
+        # notes: 新しい検出結果を反映したフレームだけを記録する（推論を間引いたフレームで古いキャプチャを数え直さない）
+        if self.latched_capture_time is not None:
+            self.latency_tracker.record(self.latched_capture_time, self.clock.now())
+            self.latched_capture_time = None
+
+        if self.state_publisher:
+            self.state_publisher.publish(self.broadcast_snapshot())
+
+    def record_stage(self, stage, since):
+        now = time.perf_counter()
+        self.stage_timings.add(stage, now - since)
+        return now
+
+    # notes: フレームごとのカウンタを更新し、一定間隔でメトリクスのスナップショットを公開する
+    def update_metrics(self, frame_time):
+        self.frames_rendered += 1
+        if frame_time > self.quality_governor.budget:
+            self.frames_over_budget += 1
+        now = time.perf_counter()
+        elapsed = now - self.metrics_published_at
+        if elapsed < self.metrics_interval:
+            return
+        self.metrics_exporter.publish(self.metrics_snapshot(elapsed))
+        self.metrics_published_at = now
+
+    def metrics_snapshot(self, elapsed):
+        inferences = self.inference_count
+        # notes: 推論されなかったカメラフレームを理由ごとに数える
+        dropped = {
+            "capture_failed": self.frame_bus.read_failures,
+            "no_free_buffer": self.frame_bus.dropped,
+            "inference_interval": self.interval_skipped_frames,
+            "presence_gate": (
+                self.presence_gate.stats["skipped"] if self.presence_gate else 0
+            ),
+            "worker_busy": 0,
+        }
+        if self.detection_worker:
+            dropped["worker_busy"] = self.detection_worker.skipped_frames
+            inferences += (
+                self.detection_worker.sequence - self.detection_worker.skipped_frames
+            )
+        previous_frames, previous_inferences = self.metrics_previous_counts
+        self.metrics_previous_counts = (self.frames_rendered, inferences)
+
+        stages = self.stage_timings.drain()
+        stage_samples = []
+        for stage, (mean, longest) in stages.items():
+            stage_samples.append(((("stage", stage), ("stat", "mean")), mean))
+            stage_samples.append(((("stage", stage), ("stat", "max")), longest))
+
+        reaction_samples = []
+        summary = self.reaction_summary
+        if summary and summary.count:
+            player = ("player", self.player_id)
+            for stat in ("best", "median", "p90", "mean"):
+                reaction_samples.append(
+                    ((player, ("stat", stat)), getattr(summary, stat))
+                )
+
+        return [
+            (
+                "janken_fps",
+                "gauge",
+                "Rendered frames per second",
+                [((), (self.frames_rendered - previous_frames) / elapsed)],
+            ),
+            (
+                "janken_frame_stage_seconds",
+                "gauge",
+                "Time spent in each stage of the render loop",
+                stage_samples,
+            ),
+            (
+                "janken_input_latency_seconds",
+                "gauge",
+                "Capture-to-present latency",
+                [
+                    ((("stat", "mean"),), self.latency_tracker.mean),
+                    ((("stat", "p95"),), self.latency_tracker.percentile(0.95)),
+                ],
+            ),
+            (
+                "janken_inference_rate",
+                "gauge",
+                "Hand landmark inferences per second",
+                [((), (inferences - previous_inferences) / elapsed)],
+            ),
+            (
+                "janken_inferences_total",
+                "counter",
+                "Hand landmark inferences",
+                [((), inferences)],
+            ),
+            (
+                "janken_frames_total",
+                "counter",
+                "Rendered frames",
+                [((), self.frames_rendered)],
+            ),
+            (
+                "janken_frames_over_budget_total",
+                "counter",
+                "Frames that exceeded the frame time budget",
+                [((), self.frames_over_budget)],
+            ),
+            (
+                "janken_detection_frames_dropped_total",
+                "counter",
+                "Camera frames that were not run through hand detection, by reason",
+                [((("reason", reason),), count) for reason, count in dropped.items()],
+            ),
+            (
+                "janken_particles",
+                "gauge",
+                "Live particles",
+                [((), len(self.particle_system.particles))],
+            ),
+            (
+                "janken_quality_level",
+                "gauge",
+                "Current quality level",
+                [((), self.quality_governor.level)],
+            ),
+            (
+                "janken_rounds_total",
+                "counter",
+                "Rounds played",
+                [((), self.rounds_played)],
+            ),
+            (
+                "janken_round_results_total",
+                "counter",
+                "Round results from the player's point of view",
+                [
+                    ((("result", result),), count)
+                    for result, count in self.result_counts.items()
+                ],
+            ),
+            (
+                "janken_reaction_seconds",
+                "gauge",
+                "Reaction time summary for the current player",
+                reaction_samples,
+            ),
+        ]
+
+    # notes: 配信用のスナップショット（src.broadcast.FIELDS と同じ順番）
+    def broadcast_snapshot(self):
+        return (
+            self.current_state,
+            self.round_count + 1,
+            self.player_wins,
+            self.computer_wins,
+            self.draws,
+            self.computer_gesture,
+            self.player_gesture,
+            self.game_result,
+            self.reaction_time,
+            self.latest_landmarks,
+        )
+
+    # notes: プロファイラが有効なときだけ通る経路（無効時は run_frame を直接呼ぶ）
+    def run_instrumented_frame(self):
+        state = self.current_state
+        if self.alloc_profiler.enabled:
+            self.alloc_profiler.begin_frame(state)
+        if self.frame_profiler.active:
+            self.frame_profiler.begin_frame(state)
+        self.run_frame()
+        if self.frame_profiler.active:
+            self.frame_profiler.end_frame()
+        if self.alloc_profiler.enabled:
+            self.alloc_profiler.end_frame()
+
     def run(self):
         glutInit()
 
@@ -580,38 +1243,66 @@ class JankenGame:
         logger.info("Scissors detection has been improved!")
 
         while running:
+            frame_start = time.perf_counter()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
                 elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
+                    if not self.handle_key(event.key):
                         running = False
-                    elif event.key == pygame.K_SPACE:
-                        if self.current_state == "MENU":
-                            self.start_countdown()
-                    elif event.key == pygame.K_r:
-                        self.reset_game()
-
-            self.update_game_state()
-
-            ret, frame = self.cap.read()
-            if ret:
-                frame = cv2.flip(frame, 1)
-                self.current_frame = self.process_frame(frame)
-                self.create_camera_texture(frame)
 
-            self.draw_scene()
-
-            pygame.display.flip()
-            clock.tick(60)
+            if self.alloc_profiler.enabled or self.frame_profiler.active:
+                self.run_instrumented_frame()
+            else:
+                self.run_frame()
+            # notes: 垂直同期の待ち時間を含めると常に1リフレッシュ分になり、品質を上げる余裕が見えなくなる
+            work_time = self.present_started_at - frame_start
+            self.quality_governor.update(work_time)
+            if self.metrics_exporter:
+                self.update_metrics(work_time)
+
+            if self.frame_pacer:
+                self.frame_pacer.wait()
+            else:
+                clock.tick(self.target_fps)
 
         self.cleanup()
 
     def cleanup(self):
+        self.frame_profiler.stop()
+        self.alloc_profiler.stop()
+        if self.presence_gate:
+            logger.info(self.presence_gate.summary())
         if self.camera_texture:
             glDeleteTextures([self.camera_texture])
-        self.cap.release()
-        pygame.quit()
+        if self.landmark_overlay:
+            self.landmark_overlay.release()
+        if self.render_target:
+            self.render_target.release()
+        if self.cap:
+            self.cap.release()
+        if self.detection_worker:
+            self.detection_worker.stop()
+        if self.round_recorder:
+            self.round_recorder.close()
+        if self.frame_bus:
+            self.frame_bus.close()
+        if self.landmark_recorder:
+            self.landmark_recorder.close()
+        if self.prediction_log:
+            self.prediction_log.close()
+        if self.audio_cues:
+            self.audio_cues.close()
+        if self.state_publisher:
+            self.state_publisher.close()
+        if self.metrics_exporter:
+            self.metrics_exporter.close()
+        if self.scene_reader:
+            self.scene_reader.release()
+        self.score_store.close()
+        self.reaction_stats.save(self.reaction_stats_path)
+        if not self.headless:
+            pygame.quit()
 
 
 if __name__ == "__main__":
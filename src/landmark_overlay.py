@@ -0,0 +1,94 @@
+# src/landmark_overlay.py
+import numpy as np
+from OpenGL.GL import *
+
+# notes: MediaPipe Hands の21点の接続（mp.solutions.hands.HAND_CONNECTIONS と同じ）
+HAND_CONNECTIONS = [
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+]  # fmt: skip
+LANDMARK_COUNT = 21
+
+
+# notes: 手のランドマークをGPU側で描画するクラス
+# 正規化座標（x: 右, y: 下, z: 奥行き）をそのままVBOに置き、配置は行列で行うので
+# カメラ映像への重ね描きと3Dスケルトンで同じバッファを使い回せる
+class LandmarkOverlay:
+    def __init__(self):
+        self.vertices = np.zeros((LANDMARK_COUNT, 3), dtype=np.float32)
+        self.indices = np.array(HAND_CONNECTIONS, dtype=np.uint16).ravel()
+        self.visible = False
+        self.dirty = False
+
+        self.vertex_buffer = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vertex_buffer)
+        glBufferData(GL_ARRAY_BUFFER, self.vertices.nbytes, None, GL_DYNAMIC_DRAW)
+        self.index_buffer = glGenBuffers(1)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.index_buffer)
+        glBufferData(
+            GL_ELEMENT_ARRAY_BUFFER, self.indices.nbytes, self.indices, GL_STATIC_DRAW
+        )
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    # notes: 検出結果が変わったときだけ呼ばれ、アップロードは次の描画まで遅らせる
+    def set_landmarks(self, points):
+        if points is None:
+            self.visible = False
+            return
+        self.vertices[...] = points
+        self.visible = True
+        self.dirty = True
+
+    def _draw_batch(self, line_color, point_color, line_width, point_size):
+        glBindBuffer(GL_ARRAY_BUFFER, self.vertex_buffer)
+        if self.dirty:
+            glBufferSubData(GL_ARRAY_BUFFER, 0, self.vertices.nbytes, self.vertices)
+            self.dirty = False
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, None)
+
+        glLineWidth(line_width)
+        glColor3f(*line_color)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.index_buffer)
+        glDrawElements(GL_LINES, len(self.indices), GL_UNSIGNED_SHORT, None)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+        glPointSize(point_size)
+        glColor3f(*point_color)
+        glDrawArrays(GL_POINTS, 0, LANDMARK_COUNT)
+
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glLineWidth(1.0)
+        glPointSize(1.0)
+
+    # notes: カメラ映像の四角形（左上 left, top と幅・高さ）に合わせて重ね描きする
+    def draw_on_quad(self, left, top, z, width, height):
+        if not self.visible:
+            return
+        glPushMatrix()
+        glTranslatef(left, top, z)
+        glScalef(width, -height, 0.0)
+        self._draw_batch((0.2, 1.0, 0.4), (1.0, 0.3, 0.3), 2.0, 5.0)
+        glPopMatrix()
+
+    # notes: 手首と中指の付け根の中点を中心にして、奥行きも含めた立体のスケルトンとして描く
+    def draw_skeleton(self, x, y, z, scale, color, angle=0.0):
+        if not self.visible:
+            return
+        center = (self.vertices[0] + self.vertices[9]) * 0.5
+        glPushMatrix()
+        glTranslatef(x, y, z)
+        glRotatef(angle, 0.0, 1.0, 0.0)
+        glScalef(scale, -scale, -scale)
+        glTranslatef(-float(center[0]), -float(center[1]), -float(center[2]))
+        point_color = tuple(min(1.0, c + 0.4) for c in color)
+        self._draw_batch(color, point_color, 4.0, 9.0)
+        glPopMatrix()
+
+    def release(self):
+        glDeleteBuffers(2, [self.vertex_buffer, self.index_buffer])
@@ -0,0 +1,147 @@
+# src/metrics_exporter.py
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.common import logger
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# notes: 描画ループの各段階の処理時間を集計するクラス（スナップショットを作るたびに平均と最大をリセットする）
+class StageTimings:
+    def __init__(self):
+        self.totals = {}
+        self.maxima = {}
+        self.counts = {}
+
+    def add(self, stage, seconds):
+        self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+        self.counts[stage] = self.counts.get(stage, 0) + 1
+        if seconds > self.maxima.get(stage, 0.0):
+            self.maxima[stage] = seconds
+
+    def drain(self):
+        result = {
+            stage: (total / self.counts[stage], self.maxima[stage])
+            for stage, total in self.totals.items()
+        }
+        self.totals = {}
+        self.maxima = {}
+        self.counts = {}
+        return result
+
+
+def _format_value(value):
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+# notes: ラベルの値は環境変数などから来るので、Prometheus のテキスト形式で必要なエスケープをする
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# notes: (名前, 種類, 説明, [(ラベル, 値), ...]) のリストを Prometheus のテキスト形式に変換する
+def format_metrics(metrics):
+    lines = []
+    for name, kind, help_text, samples in metrics:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            if labels:
+                label_text = ",".join(
+                    f'{key}="{_escape_label(val)}"' for key, val in labels
+                )
+                lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+            else:
+                lines.append(f"{name} {_format_value(value)}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.exporter.render()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# notes: ランタイムのメトリクスを公開するクラス
+# 描画ループは publish() で計算済みのスナップショットを置くだけで、テキストへの変換と
+# HTTP の応答・ファイルへの書き出しはすべて別スレッドで行う
+class MetricsExporter:
+    def __init__(self, host="127.0.0.1", port=None, file_path=None, file_interval=5.0):
+        self.file_path = file_path
+        self.file_interval = file_interval
+        self._latest = None
+        self._rendered = (None, b"")
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+        self.server = None
+        if port is not None:
+            self.server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+            self.server.daemon_threads = True
+            self.server.exporter = self
+            self._start_thread(self.server.serve_forever, "MetricsServer")
+            address = self.server.server_address
+            logger.info(f"Serving metrics on http://{address[0]}:{address[1]}/metrics")
+        if file_path:
+            self._start_thread(self._write_loop, "MetricsFileWriter")
+            logger.info(f"Writing metrics to {file_path}")
+
+    def _start_thread(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    # notes: 描画ループから呼ばれる（参照を置き換えるだけなのでブロックしない）
+    def publish(self, metrics):
+        self._latest = metrics
+
+    # notes: 同じスナップショットに対する変換結果は使い回す
+    def render(self):
+        metrics = self._latest
+        with self._lock:
+            if self._rendered[0] is not metrics:
+                body = format_metrics(metrics) if metrics is not None else b""
+                self._rendered = (metrics, body)
+            return self._rendered[1]
+
+    # notes: 書き出し途中のファイルを読まれないように、一時ファイルに書いてから置き換える
+    def write_file(self):
+        directory = os.path.dirname(self.file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.file_path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(self.render())
+        os.replace(temp_path, self.file_path)
+
+    def _write_loop(self):
+        while not self._stop.wait(self.file_interval):
+            try:
+                self.write_file()
+            except OSError as e:
+                logger.warning(f"Failed to write metrics file: {e}")
+
+    def close(self):
+        self._stop.set()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+        for thread in self._threads:
+            thread.join()
+        if self.file_path and self._latest is not None:
+            self.write_file()
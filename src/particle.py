@@ -145,12 +145,14 @@ class ParticleSystem:
     def __init__(self):
         self.particles = []
         self.max_particles = 1000
+        self.effect_scale = 1.0
 
     def add_particle(self, x, y, z, color, effect_type="normal"):
         if len(self.particles) < self.max_particles:
             self.particles.append(Particle(x, y, z, color, effect_type))
 
     def add_effect(self, effect_type, count=50):
+        count = max(1, int(count * self.effect_scale))
         for _ in range(count):
             x = random.uniform(-8, 8)
             y = random.uniform(-6, 6)
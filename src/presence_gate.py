@@ -0,0 +1,155 @@
+# src/presence_gate.py
+import argparse
+from collections import Counter
+
+import cv2
+import numpy as np
+
+from src.common import logger
+
+
+# notes: MediaPipeの前段に置く軽量な判定クラス
+# 縮小したフレームの差分（動き）と肌色領域の割合から、手が写っている可能性がある場合だけ推論させる
+# 直前の推論で手が見つかっている間は常に推論する（手を止めていても追跡を切らさないため）
+class PresenceGate:
+    def __init__(
+        self,
+        size=(32, 24),
+        motion_threshold=3.0,
+        skin_ratio_threshold=0.03,
+        recheck_interval=30,
+    ):
+        self.size = size
+        self.motion_threshold = motion_threshold
+        self.skin_ratio_threshold = skin_ratio_threshold
+        self.recheck_interval = recheck_interval
+
+        width, height = size
+        self._small = np.empty((height, width, 3), dtype=np.uint8)
+        self._gray = np.empty((height, width), dtype=np.uint8)
+        self._previous_gray = np.empty((height, width), dtype=np.uint8)
+        self._diff = np.empty((height, width), dtype=np.uint8)
+        self._ycrcb = np.empty((height, width, 3), dtype=np.uint8)
+        self._skin = np.empty((height, width), dtype=np.uint8)
+        self._has_previous = False
+
+        self.hand_present = False
+        self.frames_since_inference = 0
+        self.last_motion = 0.0
+        self.last_skin_ratio = 0.0
+        self.stats = Counter()
+
+    def should_infer(self, frame):
+        cv2.resize(frame, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+
+        if self._has_previous:
+            cv2.absdiff(self._gray, self._previous_gray, dst=self._diff)
+            self.last_motion = float(cv2.mean(self._diff)[0])
+        else:
+            self.last_motion = float("inf")
+        self._previous_gray[...] = self._gray
+        self._has_previous = True
+
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2YCrCb, dst=self._ycrcb)
+        cv2.inRange(self._ycrcb, (0, 133, 77), (255, 173, 127), dst=self._skin)
+        self.last_skin_ratio = cv2.countNonZero(self._skin) / self._skin.size
+
+        if self.hand_present:
+            reason = "tracking"
+        elif self.frames_since_inference >= self.recheck_interval:
+            reason = "recheck"
+        elif self.last_motion < self.motion_threshold:
+            reason = None
+            self.stats["skip_no_motion"] += 1
+        elif self.last_skin_ratio < self.skin_ratio_threshold:
+            reason = None
+            self.stats["skip_no_skin"] += 1
+        else:
+            reason = "motion"
+
+        if reason is None:
+            self.stats["skipped"] += 1
+            self.frames_since_inference += 1
+            return False
+
+        self.stats["inferred"] += 1
+        self.stats[f"infer_{reason}"] += 1
+        self.frames_since_inference = 0
+        return True
+
+    def mark_result(self, hand_found):
+        self.hand_present = hand_found
+        if hand_found:
+            self.stats["inferred_with_hand"] += 1
+
+    @property
+    def skip_ratio(self):
+        total = self.stats["skipped"] + self.stats["inferred"]
+        return self.stats["skipped"] / total if total else 0.0
+
+    def summary(self):
+        stats = self.stats
+        return (
+            f"Presence gate: skipped {stats['skipped']} / inferred {stats['inferred']}"
+            f" ({self.skip_ratio:.1%} skipped; no motion {stats['skip_no_motion']},"
+            f" no skin {stats['skip_no_skin']}), inferred with hand"
+            f" {stats['inferred_with_hand']} (tracking {stats['infer_tracking']},"
+            f" motion {stats['infer_motion']}, recheck {stats['infer_recheck']})"
+        )
+
+
+# notes: 録画した映像で、ゲートの判定とMediaPipeの結果を突き合わせて閾値を調整するためのツール
+def main():
+    import mediapipe as mp
+
+    parser = argparse.ArgumentParser(
+        description="Replay footage through the presence gate and MediaPipe"
+    )
+    parser.add_argument("video")
+    parser.add_argument("--motion-threshold", type=float, default=3.0)
+    parser.add_argument("--skin-ratio-threshold", type=float, default=0.03)
+    parser.add_argument("--recheck-interval", type=int, default=30)
+    parser.add_argument("--no-mirror", action="store_true")
+    args = parser.parse_args()
+
+    gate = PresenceGate(
+        motion_threshold=args.motion_threshold,
+        skin_ratio_threshold=args.skin_ratio_threshold,
+        recheck_interval=args.recheck_interval,
+    )
+    hands = mp.solutions.hands.Hands(
+        static_image_mode=False,
+        max_num_hands=1,
+        min_detection_confidence=0.8,
+        min_tracking_confidence=0.7,
+    )
+    outcomes = Counter()
+    cap = cv2.VideoCapture(args.video)
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if not args.no_mirror:
+            frame = cv2.flip(frame, 1)
+
+        infer = gate.should_infer(frame)
+        # notes: 正解データとして全フレームでMediaPipeを実行する
+        results = hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        hand_found = bool(results.multi_hand_landmarks)
+        if infer:
+            gate.mark_result(hand_found)
+        outcomes[(infer, hand_found)] += 1
+    cap.release()
+
+    logger.info(gate.summary())
+    logger.info(
+        f"Skipped without hand (correct): {outcomes[(False, False)]},"
+        f" skipped with hand (missed): {outcomes[(False, True)]},"
+        f" inferred without hand (wasted): {outcomes[(True, False)]},"
+        f" inferred with hand: {outcomes[(True, True)]}"
+    )
+
+
+if __name__ == "__main__":
+    main()
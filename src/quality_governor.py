@@ -0,0 +1,132 @@
+# src/quality_governor.py
+from collections import deque
+
+from src.common import logger
+
+# notes: 品質レベルの定義（0が最高品質、数字が大きいほど軽い設定）
+QUALITY_LEVELS = [
+    {
+        "name": "high",
+        "particle_scale": 1.0,
+        "max_particles": 1000,
+        "preview_scale": 1.0,
+        "draw_landmarks": True,
+        "inference_interval": 1,
+        "render_scale": 1.0,
+    },
+    {
+        "name": "medium",
+        "particle_scale": 0.6,
+        "max_particles": 600,
+        "preview_scale": 0.75,
+        "draw_landmarks": True,
+        "inference_interval": 1,
+        "render_scale": 0.85,
+    },
+    {
+        "name": "low",
+        "particle_scale": 0.3,
+        "max_particles": 300,
+        "preview_scale": 0.5,
+        "draw_landmarks": False,
+        "inference_interval": 2,
+        "render_scale": 0.7,
+    },
+    {
+        "name": "minimum",
+        "particle_scale": 0.15,
+        "max_particles": 150,
+        "preview_scale": 0.5,
+        "draw_landmarks": False,
+        "inference_interval": 3,
+        "render_scale": 0.5,
+    },
+]
+
+
+# notes: 直近のフレーム時間を監視し、予算を超えそうなら品質を下げ、余裕があれば上げるクラス
+# 上げ下げの閾値と必要フレーム数を分けてヒステリシスを持たせ、頻繁な切り替えを防ぐ
+class QualityGovernor:
+    def __init__(
+        self,
+        target_fps=60,
+        levels=None,
+        window_size=30,
+        downgrade_ratio=1.1,
+        upgrade_ratio=0.7,
+        downgrade_frames=15,
+        upgrade_frames=180,
+        cooldown_frames=60,
+        on_change=None,
+    ):
+        self.budget = 1.0 / target_fps
+        self.levels = levels or QUALITY_LEVELS
+        self.frame_times = deque(maxlen=window_size)
+        self.downgrade_ratio = downgrade_ratio
+        self.upgrade_ratio = upgrade_ratio
+        self.downgrade_frames = downgrade_frames
+        self.upgrade_frames = upgrade_frames
+        self.cooldown_frames = cooldown_frames
+        self.on_change = on_change
+
+        self.level = 0
+        self.over_budget_count = 0
+        self.under_budget_count = 0
+        self.cooldown = 0
+
+    @property
+    def settings(self):
+        return self.levels[self.level]
+
+    @property
+    def average_frame_time(self):
+        if not self.frame_times:
+            return 0.0
+        return sum(self.frame_times) / len(self.frame_times)
+
+    def update(self, frame_time):
+        self.frame_times.append(frame_time)
+        if self.cooldown > 0:
+            self.cooldown -= 1
+            return self.settings
+        if len(self.frame_times) < self.frame_times.maxlen:
+            return self.settings
+
+        average = self.average_frame_time
+        if average > self.budget * self.downgrade_ratio:
+            self.over_budget_count += 1
+            self.under_budget_count = 0
+        elif average < self.budget * self.upgrade_ratio:
+            self.under_budget_count += 1
+            self.over_budget_count = 0
+        else:
+            self.over_budget_count = 0
+            self.under_budget_count = 0
+
+        if (
+            self.over_budget_count >= self.downgrade_frames
+            and self.level < len(self.levels) - 1
+        ):
+            self.set_level(self.level + 1, average)
+        elif self.under_budget_count >= self.upgrade_frames and self.level > 0:
+            self.set_level(self.level - 1, average)
+
+        return self.settings
+
+    def set_level(self, level, average=None):
+        level = max(0, min(level, len(self.levels) - 1))
+        previous = self.level
+        self.level = level
+        self.over_budget_count = 0
+        self.under_budget_count = 0
+        self.cooldown = self.cooldown_frames
+        self.frame_times.clear()
+
+        if level != previous:
+            average_ms = (average or 0.0) * 1000
+            logger.info(
+                f"Quality {self.levels[previous]['name']} -> {self.settings['name']}"
+                f" (avg frame time {average_ms:.1f}ms, budget {self.budget * 1000:.1f}ms)"
+            )
+        if self.on_change:
+            self.on_change(self.settings)
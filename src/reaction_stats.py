@@ -0,0 +1,270 @@
+# src/reaction_stats.py
+import json
+import math
+import os
+import random
+from collections import OrderedDict
+
+from src.common import logger
+
+
+# notes: 平均・分散をオンラインで計算するクラス（Welford法）
+# 他のインスタンスとマージできるので、複数のキオスクの統計をまとめられる
+class RunningStats:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.variance)
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.count = data["count"]
+        stats.mean = data["mean"]
+        stats.m2 = data["m2"]
+        stats.min = data["min"]
+        stats.max = data["max"]
+        return stats
+
+
+# notes: KLLスケッチによる分位点の近似
+# レベルhの要素は重み2^hを持ち、容量を超えたレベルは半分に圧縮して上のレベルへ送る
+class KLLSketch:
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.count = 0
+        self.levels = [[]]
+        self._rng = random.Random(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _size(self):
+        return sum(len(items) for items in self.levels)
+
+    def _max_size(self):
+        return sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def update(self, value):
+        self.levels[0].append(value)
+        self.count += 1
+        if self._size() >= self._max_size():
+            self._compress()
+
+    def _compress(self):
+        for h in range(len(self.levels)):
+            if len(self.levels[h]) >= self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append([])
+                items = sorted(self.levels[h])
+                # notes: 奇数個の場合は1つ残して偶数個だけ圧縮する
+                keep = [items.pop()] if len(items) % 2 else []
+                offset = self._rng.randint(0, 1)
+                self.levels[h + 1].extend(items[offset::2])
+                self.levels[h] = keep
+                return True
+        return False
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for h, items in enumerate(other.levels):
+            self.levels[h].extend(items)
+        self.count += other.count
+        while self._size() >= self._max_size() and self._compress():
+            pass
+
+    def _weighted_items(self):
+        weighted = []
+        for h, items in enumerate(self.levels):
+            weight = 1 << h
+            weighted.extend((value, weight) for value in items)
+        weighted.sort()
+        return weighted
+
+    # notes: value以下の値の割合（0〜1）を返す
+    def rank(self, value):
+        if self.count == 0:
+            return 0.0
+        total = 0
+        below = 0
+        for h, items in enumerate(self.levels):
+            weight = 1 << h
+            total += weight * len(items)
+            below += weight * sum(1 for item in items if item <= value)
+        return below / total if total else 0.0
+
+    def quantile(self, q):
+        if self.count == 0:
+            return None
+        weighted = self._weighted_items()
+        total = sum(weight for _, weight in weighted)
+        target = q * total
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]
+
+    def to_dict(self):
+        return {"k": self.k, "count": self.count, "levels": self.levels}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(k=data["k"])
+        sketch.count = data["count"]
+        sketch.levels = [list(items) for items in data["levels"]] or [[]]
+        return sketch
+
+
+class ReactionSummary:
+    def __init__(self, best, median, p90, mean, count, percentile_rank):
+        self.best = best
+        self.median = median
+        self.p90 = p90
+        self.mean = mean
+        self.count = count
+        self.percentile_rank = percentile_rank
+
+
+# notes: プレイヤーごと・全体の反応時間統計を管理するクラス
+# プレイヤー数が max_players を超えた場合は最も長く更新されていないものから破棄する
+class ReactionStatsEngine:
+    def __init__(self, k=200, max_players=10000):
+        self.k = k
+        self.max_players = max_players
+        self.global_stats = RunningStats()
+        self.global_sketch = KLLSketch(k)
+        self.players = OrderedDict()
+
+    def _player_entry(self, player_id):
+        entry = self.players.get(player_id)
+        if entry is None:
+            entry = (RunningStats(), KLLSketch(self.k))
+            self.players[player_id] = entry
+            if len(self.players) > self.max_players:
+                self.players.popitem(last=False)
+        else:
+            self.players.move_to_end(player_id)
+        return entry
+
+    def update(self, player_id, reaction_time):
+        stats, sketch = self._player_entry(player_id)
+        stats.update(reaction_time)
+        sketch.update(reaction_time)
+        self.global_stats.update(reaction_time)
+        self.global_sketch.update(reaction_time)
+
+    # notes: 自分の中央値より遅い反応時間の割合を percentile_rank とする（大きいほど速い）
+    def summary(self, player_id):
+        entry = self.players.get(player_id)
+        if entry is None or entry[0].count == 0:
+            return None
+        stats, sketch = entry
+        median = sketch.quantile(0.5)
+        return ReactionSummary(
+            best=stats.min,
+            median=median,
+            p90=sketch.quantile(0.9),
+            mean=stats.mean,
+            count=stats.count,
+            percentile_rank=1.0 - self.global_sketch.rank(median),
+        )
+
+    def merge(self, other):
+        self.global_stats.merge(other.global_stats)
+        self.global_sketch.merge(other.global_sketch)
+        for player_id, (stats, sketch) in other.players.items():
+            own_stats, own_sketch = self._player_entry(player_id)
+            own_stats.merge(stats)
+            own_sketch.merge(sketch)
+
+    def to_dict(self):
+        return {
+            "k": self.k,
+            "global": {
+                "stats": self.global_stats.to_dict(),
+                "sketch": self.global_sketch.to_dict(),
+            },
+            "players": {
+                player_id: {"stats": stats.to_dict(), "sketch": sketch.to_dict()}
+                for player_id, (stats, sketch) in self.players.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data, max_players=10000):
+        engine = cls(k=data["k"], max_players=max_players)
+        engine.global_stats = RunningStats.from_dict(data["global"]["stats"])
+        engine.global_sketch = KLLSketch.from_dict(data["global"]["sketch"])
+        for player_id, entry in data["players"].items():
+            engine.players[player_id] = (
+                RunningStats.from_dict(entry["stats"]),
+                KLLSketch.from_dict(entry["sketch"]),
+            )
+        return engine
+
+    def save(self, path):
+        path_dir = os.path.dirname(path)
+        if path_dir:
+            os.makedirs(path_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, encoding="utf-8") as f:
+                return cls.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Failed to load reaction stats from {path}: {e}")
+            return cls()
@@ -0,0 +1,123 @@
+# src/render_target.py
+from OpenGL.error import GLError, NullFunctionError
+from OpenGL.GL import *
+
+from src.common import logger
+
+
+# notes: 3Dシーンを内部解像度のオフスクリーンFBOに描き、ウィンドウへ拡大して転送するクラス
+# scale が 1.0 の場合はFBOを作らず、既定のフレームバッファに直接描く（追加のコストなし）
+class RenderTarget:
+    def __init__(self, window_size, scale=1.0, min_scale=0.25):
+        self.window_width, self.window_height = window_size
+        self.min_scale = min_scale
+        self.framebuffer = None
+        self.color_buffer = None
+        self.depth_buffer = None
+        self.width = self.window_width
+        self.height = self.window_height
+        self.scale = None
+        self.supported = True
+        self.set_scale(scale)
+
+    @property
+    def active(self):
+        return self.framebuffer is not None
+
+    def set_scale(self, scale):
+        scale = min(max(scale, self.min_scale), 1.0)
+        if not self.supported:
+            scale = 1.0
+        if scale == self.scale:
+            return
+        self.release()
+        self.scale = scale
+        self.width = max(1, round(self.window_width * scale))
+        self.height = max(1, round(self.window_height * scale))
+        if scale >= 1.0:
+            logger.info(f"Rendering at native {self.width}x{self.height}")
+            return
+
+        # notes: FBOの関数がないGL環境では例外になるので、ゲームを止めずに直接描画へ戻す
+        try:
+            status = self._create()
+        except (GLError, NullFunctionError) as e:
+            status = e
+        if status != GL_FRAMEBUFFER_COMPLETE:
+            logger.warning(
+                f"Offscreen framebuffer is not supported ({status}),"
+                " rendering at native resolution"
+            )
+            self.release()
+            self.supported = False
+            self.scale = 1.0
+            self.width = self.window_width
+            self.height = self.window_height
+            return
+        logger.info(
+            f"Rendering at {self.width}x{self.height}"
+            f" ({scale:.0%} of {self.window_width}x{self.window_height})"
+        )
+
+    def _create(self):
+        self.color_buffer = glGenRenderbuffers(1)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.color_buffer)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, self.width, self.height)
+        self.depth_buffer = glGenRenderbuffers(1)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.depth_buffer)
+        glRenderbufferStorage(
+            GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, self.width, self.height
+        )
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+
+        self.framebuffer = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.framebuffer)
+        glFramebufferRenderbuffer(
+            GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, self.color_buffer
+        )
+        glFramebufferRenderbuffer(
+            GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, self.depth_buffer
+        )
+        status = glCheckFramebufferStatus(GL_FRAMEBUFFER)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        return status
+
+    # notes: 以降の描画先を内部解像度のFBOにする
+    def begin(self):
+        if self.framebuffer is None:
+            return
+        glBindFramebuffer(GL_FRAMEBUFFER, self.framebuffer)
+        glViewport(0, 0, self.width, self.height)
+
+    # notes: FBOの内容をウィンドウ全体に拡大して転送し、描画先を既定のフレームバッファに戻す
+    # HUDを描く前に深度を消して、ウィンドウ側の古い深度値で文字が隠れないようにする
+    def end(self):
+        if self.framebuffer is None:
+            return
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, self.framebuffer)
+        glBindFramebuffer(GL_DRAW_FRAMEBUFFER, 0)
+        glBlitFramebuffer(
+            0,
+            0,
+            self.width,
+            self.height,
+            0,
+            0,
+            self.window_width,
+            self.window_height,
+            GL_COLOR_BUFFER_BIT,
+            GL_LINEAR,
+        )
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        glViewport(0, 0, self.window_width, self.window_height)
+        glClear(GL_DEPTH_BUFFER_BIT)
+
+    def release(self):
+        if self.framebuffer is not None:
+            glDeleteFramebuffers(1, [self.framebuffer])
+        buffers = [b for b in (self.color_buffer, self.depth_buffer) if b is not None]
+        if buffers:
+            glDeleteRenderbuffers(len(buffers), buffers)
+        self.framebuffer = None
+        self.color_buffer = None
+        self.depth_buffer = None
@@ -0,0 +1,112 @@
+# src/scheduler.py
+import heapq
+import itertools
+import time
+from collections import deque
+
+from src.common import logger
+
+
+# notes: 実時間の単調増加クロック（システム時刻の変更の影響を受けない）
+class MonotonicClock:
+    def now(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+# notes: テストやシミュレーション用の手動で進めるクロック
+class ManualClock:
+    def __init__(self, start=0.0):
+        self.current = start
+
+    def now(self):
+        return self.current
+
+    def advance(self, seconds):
+        self.current += seconds
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.current += seconds
+
+
+class Timer:
+    def __init__(self, deadline, name, callback):
+        self.deadline = deadline
+        self.name = name
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+# notes: 締め切り時刻順にタイマーを発火させるスケジューラ
+# コールバックには予定時刻が渡されるため、遷移は実際の発火時刻ではなく予定時刻を基準に連鎖する
+# ただし resync_after 秒以上遅れて発火した場合は、溜まった遷移が続けて過ぎないように現在時刻を渡して連鎖させ直す
+class TimerScheduler:
+    def __init__(self, clock=None, log_size=256, resync_after=0.1):
+        self.clock = clock or MonotonicClock()
+        self.resync_after = resync_after
+        self._heap = []
+        self._sequence = itertools.count()
+        self.transition_log = deque(maxlen=log_size)
+        self.fired_count = 0
+        self.resync_count = 0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+
+    def schedule_at(self, deadline, name, callback):
+        timer = Timer(deadline, name, callback)
+        heapq.heappush(self._heap, (deadline, next(self._sequence), timer))
+        return timer
+
+    def schedule_after(self, delay, name, callback, start=None):
+        start = self.clock.now() if start is None else start
+        return self.schedule_at(start + delay, name, callback)
+
+    def cancel_all(self):
+        for _, _, timer in self._heap:
+            timer.cancel()
+        self._heap = []
+
+    @property
+    def next_deadline(self):
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    @property
+    def mean_lag(self):
+        return self.total_lag / self.fired_count if self.fired_count else 0.0
+
+    # notes: 締め切りを過ぎたタイマーを1つだけ発火させる（発火した数を返す）
+    # 停止などで複数の遷移が溜まっていても1回の呼び出しでは1つしか進めないので、どの状態も少なくとも1フレームは続く
+    def run_due(self, now=None):
+        now = self.clock.now() if now is None else now
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, timer = heapq.heappop(self._heap)
+            if timer.cancelled:
+                continue
+
+            lag = now - deadline
+            self.fired_count += 1
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+            self.transition_log.append((timer.name, deadline, now))
+            logger.debug(f"Transition {timer.name}: lag {lag * 1000:.2f}ms")
+
+            if lag > self.resync_after:
+                self.resync_count += 1
+                logger.info(
+                    f"Transition {timer.name} fired {lag * 1000:.0f}ms late,"
+                    " rescheduling the following transitions from now"
+                )
+                timer.callback(now)
+            else:
+                timer.callback(deadline)
+            return 1
+        return 0
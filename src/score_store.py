@@ -0,0 +1,259 @@
+# src/score_store.py
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from src.common import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rounds (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    player_id TEXT NOT NULL,
+    round_no INTEGER NOT NULL,
+    computer_gesture TEXT NOT NULL,
+    player_gesture TEXT,
+    result TEXT NOT NULL,
+    reaction_time REAL,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    day TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rounds_player_time
+    ON rounds (player_id, finished_at DESC);
+CREATE INDEX IF NOT EXISTS idx_rounds_session
+    ON rounds (session_id, round_no);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    player_id TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    last_played_at REAL NOT NULL,
+    round_count INTEGER NOT NULL DEFAULT 0,
+    player_wins INTEGER NOT NULL DEFAULT 0,
+    computer_wins INTEGER NOT NULL DEFAULT 0,
+    draws INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS daily_scores (
+    day TEXT NOT NULL,
+    player_id TEXT NOT NULL,
+    wins INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    draws INTEGER NOT NULL DEFAULT 0,
+    best_reaction REAL,
+    PRIMARY KEY (day, player_id)
+) WITHOUT ROWID;
+DROP INDEX IF EXISTS idx_daily_scores_rank;
+CREATE INDEX IF NOT EXISTS idx_daily_scores_rank_nulls_last
+    ON daily_scores (day, wins DESC, best_reaction IS NULL, best_reaction);
+"""
+
+INSERT_ROUND = """
+INSERT INTO rounds (
+    session_id, player_id, round_no, computer_gesture, player_gesture,
+    result, reaction_time, started_at, finished_at, day
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+UPSERT_SESSION = """
+INSERT INTO sessions (
+    session_id, player_id, started_at, last_played_at,
+    round_count, player_wins, computer_wins, draws
+) VALUES (?, ?, ?, ?, 1, ?, ?, ?)
+ON CONFLICT (session_id) DO UPDATE SET
+    last_played_at = excluded.last_played_at,
+    round_count = round_count + 1,
+    player_wins = player_wins + excluded.player_wins,
+    computer_wins = computer_wins + excluded.computer_wins,
+    draws = draws + excluded.draws
+"""
+
+UPSERT_DAILY = """
+INSERT INTO daily_scores (day, player_id, wins, losses, draws, best_reaction)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (day, player_id) DO UPDATE SET
+    wins = wins + excluded.wins,
+    losses = losses + excluded.losses,
+    draws = draws + excluded.draws,
+    best_reaction = CASE
+        WHEN excluded.best_reaction IS NULL THEN best_reaction
+        WHEN best_reaction IS NULL THEN excluded.best_reaction
+        ELSE MIN(best_reaction, excluded.best_reaction)
+    END
+"""
+
+
+# notes: ラウンド結果をSQLiteに永続化するクラス
+# 書き込みはキューに積むだけで、バックグラウンドスレッドがまとめてコミットする
+# 読み出しのメソッドは既定でキューに積まれた書き込みのコミットを待ってから読む（フレームループからは呼ばない）
+class ScoreStore:
+    def __init__(self, db_path, batch_size=64, flush_interval=0.5, max_pending=10000):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.close()
+
+        self.dropped_rounds = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._stop = object()
+        self._writer = threading.Thread(
+            target=self._writer_loop, name="ScoreStoreWriter", daemon=True
+        )
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # notes: フレームループから呼ばれるため、ディスクには触れずキューに積むだけ
+    def record_round(
+        self,
+        session_id,
+        player_id,
+        round_no,
+        computer_gesture,
+        player_gesture,
+        result,
+        reaction_time,
+        started_at,
+        finished_at=None,
+    ):
+        finished_at = finished_at if finished_at is not None else time.time()
+        record = (
+            session_id,
+            player_id,
+            round_no,
+            computer_gesture,
+            player_gesture,
+            result,
+            reaction_time,
+            started_at,
+            finished_at,
+            time.strftime("%Y-%m-%d", time.localtime(finished_at)),
+        )
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped_rounds += 1
+            logger.warning("Score store queue is full, round was not persisted")
+
+    def _writer_loop(self):
+        conn = self._connect()
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = []
+            while True:
+                if item is self._stop:
+                    running = False
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    self._write_batch(conn, batch)
+                except sqlite3.Error as e:
+                    logger.exception(f"Failed to persist {len(batch)} rounds: {e}")
+            # notes: flush() が待てるように、取り出した分（終了の指示も含む）を完了にする
+            for _ in range(len(batch) + (0 if running else 1)):
+                self._queue.task_done()
+        conn.close()
+
+    # notes: それまでに積まれたラウンドがすべてコミットされるまで待つ
+    def flush(self):
+        if self._writer.is_alive():
+            self._queue.join()
+
+    def _write_batch(self, conn, batch):
+        sessions = []
+        daily = []
+        for (
+            session_id,
+            player_id,
+            _round_no,
+            _computer_gesture,
+            _player_gesture,
+            result,
+            reaction_time,
+            started_at,
+            finished_at,
+            day,
+        ) in batch:
+            win = 1 if result == "win" else 0
+            lose = 1 if result == "lose" else 0
+            draw = 1 if result == "draw" else 0
+            sessions.append(
+                (session_id, player_id, started_at, finished_at, win, lose, draw)
+            )
+            daily.append(
+                (day, player_id, win, lose, draw, reaction_time if win else None)
+            )
+
+        with conn:
+            conn.executemany(INSERT_ROUND, batch)
+            conn.executemany(UPSERT_SESSION, sessions)
+            conn.executemany(UPSERT_DAILY, daily)
+
+    # notes: プレイヤーごとの履歴を新しい順に取得する
+    def get_player_history(self, player_id, limit=50, before=None, flush=True):
+        if flush:
+            self.flush()
+        sql = (
+            "SELECT session_id, round_no, computer_gesture, player_gesture, result,"
+            " reaction_time, started_at, finished_at FROM rounds WHERE player_id = ?"
+        )
+        params = [player_id]
+        if before is not None:
+            sql += " AND finished_at < ?"
+            params.append(before)
+        sql += " ORDER BY finished_at DESC LIMIT ?"
+        params.append(limit)
+
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    # notes: 指定日の上位プレイヤーを取得する（勝利数が多く、反応時間が速い順）
+    # 並び順は idx_daily_scores_rank_nulls_last と同じ式にして、索引の順に読むだけで済むようにする
+    def get_daily_top(self, day=None, limit=10, flush=True):
+        if flush:
+            self.flush()
+        day = day or time.strftime("%Y-%m-%d")
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT player_id, wins, losses, draws, best_reaction FROM daily_scores"
+                " WHERE day = ?"
+                " ORDER BY wins DESC, best_reaction IS NULL, best_reaction LIMIT ?",
+                (day, limit),
+            ).fetchall()
+        finally:
+            conn.close()
+
+    def close(self):
+        self._queue.put(self._stop)
+        self._writer.join()
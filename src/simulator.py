@@ -0,0 +1,399 @@
+# src/simulator.py
+import argparse
+import gc
+import logging
+import math
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+import pygame
+
+from src.common import logger
+from src.janken_game import JankenGame
+from src.scheduler import ManualClock
+
+WINNING_MOVE = {"rock": "paper", "paper": "scissors", "scissors": "rock"}
+
+# notes: 各指のMCP（付け根）の位置と、伸ばしたときの指先の左右の広がり
+FINGER_MCPS = {
+    "index": (5, (0.42, 0.60), -0.05),
+    "middle": (9, (0.48, 0.58), 0.0),
+    "ring": (13, (0.54, 0.59), 0.03),
+    "pinky": (17, (0.60, 0.62), 0.07),
+}
+THUMB_EXTENDED = [(0.40, 0.80), (0.35, 0.74), (0.31, 0.68), (0.28, 0.63)]
+THUMB_FOLDED = [(0.40, 0.80), (0.39, 0.75), (0.38, 0.70), (0.44, 0.72)]
+EXTENDED_FINGERS = {
+    "rock": set(),
+    "paper": {"thumb", "index", "middle", "ring", "pinky"},
+    "scissors": {"index", "middle"},
+}
+
+
+# notes: ジェスチャーごとのランドマークのテンプレート（21点, 画像座標）を作る
+def build_template(gesture):
+    points = [(0.50, 0.85)] + [None] * 20
+    thumb = THUMB_EXTENDED if "thumb" in EXTENDED_FINGERS[gesture] else THUMB_FOLDED
+    points[1:5] = thumb
+    for finger, (mcp_index, (mx, my), spread) in FINGER_MCPS.items():
+        points[mcp_index] = (mx, my)
+        if finger in EXTENDED_FINGERS[gesture]:
+            points[mcp_index + 1] = (mx + spread * 0.4, my - 0.10)
+            points[mcp_index + 2] = (mx + spread * 0.7, my - 0.16)
+            points[mcp_index + 3] = (mx + spread, my - 0.21)
+        else:
+            points[mcp_index + 1] = (mx, my - 0.05)
+            points[mcp_index + 2] = (mx, my - 0.02)
+            points[mcp_index + 3] = (mx, my + 0.01)
+    return points
+
+
+TEMPLATES = {gesture: np.array(build_template(gesture)) for gesture in EXTENDED_FINGERS}
+
+
+# notes: MediaPipeの検出結果と同じ形（hand.landmark[i].x / .y / .z）を持つ軽量なオブジェクト
+class SyntheticLandmark:
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z=0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+class SyntheticHand:
+    __slots__ = ("landmark",)
+
+    def __init__(self, points):
+        self.landmark = [SyntheticLandmark(x, y) for x, y in points]
+
+
+# notes: シミュレートされたプレイヤー
+# 反応時間は対数正規分布に従い、手は握りこぶしから目的の形へ settle_time 秒かけて変化する
+class SimulatedPlayer:
+    def __init__(
+        self,
+        rng,
+        noise_rng,
+        reaction_median=0.45,
+        reaction_sigma=0.25,
+        settle_time=0.08,
+        noise=0.004,
+        dropout_rate=0.02,
+        miss_rate=0.05,
+        skill=0.5,
+    ):
+        self.rng = rng
+        self.noise_rng = noise_rng
+        self.reaction_mu = math.log(reaction_median)
+        self.reaction_sigma = reaction_sigma
+        self.settle_time = settle_time
+        self.noise = noise
+        self.dropout_rate = dropout_rate
+        self.miss_rate = miss_rate
+        self.skill = skill
+        self.plan = None
+
+    def plan_round(self, computer_gesture, detect_start):
+        if self.rng.random() < self.miss_rate:
+            self.plan = None
+            return
+        if self.rng.random() < self.skill:
+            gesture = WINNING_MOVE[computer_gesture]
+        else:
+            gesture = self.rng.choice(list(TEMPLATES))
+        reaction = self.rng.lognormvariate(self.reaction_mu, self.reaction_sigma)
+        offset = (self.rng.uniform(-0.1, 0.1), self.rng.uniform(-0.1, 0.05))
+        scale = self.rng.uniform(0.85, 1.15)
+        self.plan = (gesture, detect_start + reaction, offset, scale)
+
+    @property
+    def appear_time(self):
+        return None if self.plan is None else self.plan[1] - self.settle_time
+
+    def hands_at(self, now):
+        if self.plan is None or now < self.appear_time:
+            return None
+        if self.rng.random() < self.dropout_rate:
+            return None
+
+        gesture, _, offset, scale = self.plan
+        progress = min(1.0, (now - self.appear_time) / self.settle_time)
+        start = TEMPLATES["rock"]
+        points = start + (TEMPLATES[gesture] - start) * progress
+        points = 0.5 + (points - 0.5) * scale + offset
+        points += self.noise_rng.normal(0.0, self.noise, points.shape)
+        return [SyntheticHand(points.tolist())]
+
+
+def read_rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# notes: 仮想時間でゲームを進めるシミュレーター
+# 入力が意味を持たない状態（カウントダウンや結果表示）では次の遷移の締め切りまで一気に時間を進める
+class GameSimulator:
+    def __init__(self, game, player, rng, fps=60, reset_rate=0.0):
+        self.game = game
+        self.player = player
+        self.rng = rng
+        self.frame_interval = 1.0 / fps
+        self.reset_rate = reset_rate
+        self.frames = 0
+        self.rounds = 0
+        self.resets = 0
+        self.results = Counter()
+        self.player_gestures = Counter()
+        self.checkpoints = []
+        self.baseline = None
+
+    def step_frame(self, now):
+        game = self.game
+        profiler = game.alloc_profiler
+        if profiler.enabled:
+            profiler.begin_frame(game.current_state)
+        game.clock.current = now
+        game.update_game_state()
+        # notes: シミュレーターでは描画にかかる時間を考えず、各フレームは now に表示されたものとする
+        game.mark_presented(now)
+        if game.current_state == "DETECT":
+            game.apply_detection(self.player.hands_at(now), now)
+        game.particle_system.update()
+        self.frames += 1
+        if profiler.enabled:
+            profiler.end_frame()
+
+    def play_round(self):
+        game = self.game
+        clock = game.clock
+        game.handle_key(pygame.K_SPACE)
+        planned = False
+
+        while game.current_state != "MENU":
+            now = clock.now()
+            if game.current_state == "DETECT":
+                if not planned:
+                    self.player.plan_round(game.computer_gesture, game.state_start_time)
+                    planned = True
+                next_frame = now + self.frame_interval
+                appear_time = self.player.appear_time
+                deadline = game.scheduler.next_deadline
+                # notes: 手が見えるまでのフレームは結果が変わらないので飛ばす
+                if appear_time is None:
+                    next_frame = float("inf")
+                elif next_frame < appear_time:
+                    frames_to_skip = math.ceil(
+                        (appear_time - now) / self.frame_interval
+                    )
+                    next_frame = now + frames_to_skip * self.frame_interval
+                if deadline is not None and deadline < next_frame:
+                    next_frame = max(deadline, now + self.frame_interval)
+                self.step_frame(next_frame)
+            else:
+                deadline = game.scheduler.next_deadline
+                if deadline is None:
+                    break
+                self.step_frame(max(deadline, now + self.frame_interval))
+
+            # notes: 1ステップで進む仮想時間は一定ではないため、進んだ時間に応じた確率でRキーを押す
+            elapsed = clock.now() - now
+            if self.reset_rate and self.rng.random() < 1.0 - math.exp(
+                -self.reset_rate * elapsed
+            ):
+                game.handle_key(pygame.K_r)
+                self.resets += 1
+                return
+
+        self.rounds += 1
+        self.results[game.game_result] += 1
+        self.player_gestures[game.player_gesture or "none"] += 1
+
+    def checkpoint(self, wall_elapsed):
+        gc.collect()
+        self.checkpoints.append(
+            {
+                "rounds": self.rounds,
+                "wall": wall_elapsed,
+                "rss": read_rss_bytes(),
+                "objects": len(gc.get_objects()),
+                "particles": len(self.game.particle_system.particles),
+            }
+        )
+
+    def run(self, rounds, report_every=1000):
+        start = time.perf_counter()
+        virtual_start = self.game.clock.now()
+        self.checkpoint(0.0)
+        # notes: 起動直後の確保の影響を除くため、report_every に関係なく少し回した時点を基準にする
+        warmup = min(100, max(1, rounds // 10), rounds - 1)
+        if warmup <= 0:
+            self.baseline = self.checkpoints[0]
+        while self.rounds < rounds:
+            self.play_round()
+            if self.baseline is None and self.rounds >= warmup:
+                self.checkpoint(time.perf_counter() - start)
+                self.baseline = self.checkpoints[-1]
+            if self.rounds and self.rounds % report_every == 0:
+                if self.checkpoints[-1]["rounds"] != self.rounds:
+                    self.checkpoint(time.perf_counter() - start)
+                    last = self.checkpoints[-1]
+                    print(
+                        f"{self.rounds} rounds, {self.rounds / last['wall']:.0f} rounds/s,"
+                        f" RSS {last['rss'] / 1e6:.1f}MB"
+                    )
+        elapsed = time.perf_counter() - start
+        self.checkpoint(elapsed)
+        return elapsed, self.game.clock.now() - virtual_start
+
+    def report(self, elapsed, virtual_elapsed):
+        baseline = self.baseline or self.checkpoints[0]
+        final = self.checkpoints[-1]
+        rounds_measured = max(1, final["rounds"] - baseline["rounds"])
+        rss_growth = final["rss"] - baseline["rss"]
+        object_growth = final["objects"] - baseline["objects"]
+
+        lines = [
+            "=== Simulation report ===",
+            f"Rounds: {self.rounds} (resets: {self.resets}), frames: {self.frames}",
+            f"Wall time: {elapsed:.2f}s, virtual time: {virtual_elapsed / 3600:.2f}h"
+            f" ({virtual_elapsed / max(elapsed, 1e-9):.0f}x real time)",
+            f"Throughput: {self.rounds / max(elapsed, 1e-9):.0f} rounds/s,"
+            f" {self.frames / max(elapsed, 1e-9):.0f} frames/s",
+            f"RSS growth: {rss_growth / 1e6:+.2f}MB"
+            f" ({rss_growth / rounds_measured * 1000 / 1e3:+.2f}KB per 1000 rounds)",
+            f"GC object growth: {object_growth:+d}"
+            f" ({object_growth / rounds_measured * 1000:+.1f} per 1000 rounds)",
+            "Results: "
+            + ", ".join(
+                f"{result}: {count} ({count / max(self.rounds, 1):.1%})"
+                for result, count in sorted(self.results.items())
+            ),
+            "Player gestures: "
+            + ", ".join(
+                f"{gesture}: {count}"
+                for gesture, count in sorted(self.player_gestures.items())
+            ),
+        ]
+        summary = self.game.reaction_stats.summary(self.game.player_id)
+        if summary:
+            lines.append(
+                f"Reaction time: mean {summary.mean:.3f}s, median {summary.median:.3f}s,"
+                f" p90 {summary.p90:.3f}s, best {summary.best:.3f}s"
+            )
+        if self.game.prediction_log:
+            lines.append(self.game.prediction_log.summary())
+        if self.game.audio_cues:
+            lines.append(self.game.audio_cues.summary())
+        scheduler = self.game.scheduler
+        lines.append(
+            f"Transition lag: mean {scheduler.mean_lag * 1000:.2f}ms,"
+            f" max {scheduler.max_lag * 1000:.2f}ms,"
+            f" {scheduler.resync_count} rescheduled"
+        )
+        print("\n".join(lines))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the game headless in virtual time for soak testing"
+    )
+    parser.add_argument("--rounds", type=int, default=10000)
+    parser.add_argument("--fps", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reaction-median", type=float, default=0.45)
+    parser.add_argument("--reaction-sigma", type=float, default=0.25)
+    parser.add_argument("--noise", type=float, default=0.004)
+    parser.add_argument("--dropout-rate", type=float, default=0.02)
+    parser.add_argument("--miss-rate", type=float, default=0.05)
+    parser.add_argument("--skill", type=float, default=0.5)
+    parser.add_argument(
+        "--reset-rate", type=float, default=0.0, help="R key presses per second"
+    )
+    parser.add_argument("--report-every", type=int, default=1000)
+    parser.add_argument(
+        "--alloc-profile",
+        action="store_true",
+        help="Track per-frame allocations and GC pauses (slow)",
+    )
+    parser.add_argument(
+        "--alloc-snapshots",
+        action="store_true",
+        help="Also snapshot memory on every state change (much slower)",
+    )
+    parser.add_argument(
+        "--alloc-count-interval",
+        type=int,
+        default=30,
+        help="Count allocated blocks every N frames (0 disables, 1 is very slow)",
+    )
+    parser.add_argument(
+        "--predictive",
+        action="store_true",
+        help="Enable the predictive gesture commit and report its accuracy",
+    )
+    parser.add_argument(
+        "--audio",
+        action="store_true",
+        help="Play the audio cues through the dummy driver and report their offsets",
+    )
+    parser.add_argument(
+        "--data-dir", help="Where to write the score database (default: temp dir)"
+    )
+    args = parser.parse_args()
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="janken-sim-")
+    os.environ["SCORE_DB_PATH"] = os.path.join(data_dir, "janken.sqlite3")
+    os.environ["REACTION_STATS_PATH"] = os.path.join(data_dir, "reaction_stats.json")
+    os.environ.pop("LANDMARK_RECORD_PATH", None)
+    os.environ["AUDIO_CUES"] = "1" if args.audio else "0"
+    if args.predictive:
+        os.environ["PREDICTIVE_COMMIT"] = "1"
+        os.environ["PREDICTION_LOG_PATH"] = os.path.join(data_dir, "predictions.jsonl")
+    # notes: ラウンドごとのログが大量に出るため、ゲームのログはWARNING以上のみ出力する
+    # シミュレーションのレポートはログではなく標準出力に書く
+    logger.setLevel(logging.WARNING)
+
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    game = JankenGame(clock=ManualClock(), headless=True)
+    player = SimulatedPlayer(
+        rng,
+        np.random.default_rng(args.seed),
+        reaction_median=args.reaction_median,
+        reaction_sigma=args.reaction_sigma,
+        noise=args.noise,
+        dropout_rate=args.dropout_rate,
+        miss_rate=args.miss_rate,
+        skill=args.skill,
+    )
+    simulator = GameSimulator(
+        game, player, rng, fps=args.fps, reset_rate=args.reset_rate
+    )
+    if args.alloc_profile:
+        game.alloc_profiler.state_snapshots = args.alloc_snapshots
+        game.alloc_profiler.count_interval = args.alloc_count_interval
+        game.alloc_profiler.start()
+    alloc_report = None
+    try:
+        elapsed, virtual_elapsed = simulator.run(args.rounds, args.report_every)
+    finally:
+        alloc_report = game.alloc_profiler.stop()
+        game.cleanup()
+    simulator.report(elapsed, virtual_elapsed)
+    if alloc_report:
+        print(alloc_report)
+    print(f"Score database: {os.environ['SCORE_DB_PATH']}")
+
+
+if __name__ == "__main__":
+    main()
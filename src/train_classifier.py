@@ -0,0 +1,137 @@
+# src/train_classifier.py
+import argparse
+import glob
+import os
+
+import numpy as np
+
+from src.common import logger
+from src.detector import HandGestureDetector
+from src.gesture_classifier import (
+    MODEL_TYPES,
+    confusion_matrix,
+    format_confusion_matrix,
+    landmarks_to_features,
+    load_gesture_model,
+    load_landmark_records,
+)
+
+
+def collect_paths(inputs):
+    paths = []
+    for path in inputs:
+        if os.path.isdir(path):
+            paths.extend(
+                sorted(glob.glob(os.path.join(path, "**", "*.jsonl"), recursive=True))
+            )
+        else:
+            paths.append(path)
+    return paths
+
+
+def load_dataset(paths):
+    landmarks = []
+    labels = []
+    for path in paths:
+        for record in load_landmark_records(path):
+            if record.get("landmarks") is None or record.get("label") is None:
+                continue
+            landmarks.append(record["landmarks"])
+            labels.append(record["label"])
+    return landmarks, np.array(labels)
+
+
+def build_model(kind, k):
+    if kind == "knn":
+        return MODEL_TYPES[kind](k=k)
+    return MODEL_TYPES[kind]()
+
+
+# notes: ラベルごとに均等に分けたk-fold交差検証で学習済みモデルを評価する
+# 学習データが偏って評価できなかった分割のフレームは evaluated で除外する
+def cross_validate(kind, features, labels, folds, seed, k):
+    rng = np.random.default_rng(seed)
+    fold_ids = np.zeros(len(labels), dtype=np.int64)
+    for label in np.unique(labels):
+        members = np.flatnonzero(labels == label)
+        rng.shuffle(members)
+        fold_ids[members] = np.arange(len(members)) % folds
+
+    predictions = np.full(len(labels), "", dtype=labels.dtype)
+    evaluated = np.zeros(len(labels), dtype=bool)
+    for fold in range(folds):
+        test = fold_ids == fold
+        if not test.any() or test.all():
+            continue
+        model = build_model(kind, k).fit(features[~test], labels[~test])
+        predictions[test] = model.predict(features[test])
+        evaluated[test] = True
+    return predictions, evaluated
+
+
+def report(name, true_labels, predicted_labels):
+    labels = sorted(set(true_labels.tolist()) | set(predicted_labels.tolist()))
+    accuracy = (
+        float(np.mean(true_labels == predicted_labels)) if len(true_labels) else 0.0
+    )
+    matrix = confusion_matrix(true_labels, predicted_labels, labels)
+    logger.info(f"[{name}] accuracy: {accuracy:.1%} ({len(true_labels)} frames)")
+    logger.info(
+        f"[{name}] confusion matrix (rows: true, columns: predicted)\n"
+        + format_confusion_matrix(matrix, labels)
+    )
+    return accuracy
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Train and evaluate the learned gesture classifier on recorded landmarks"
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="Landmark recordings (.jsonl) or directories"
+    )
+    parser.add_argument("--model", choices=sorted(MODEL_TYPES), default="logistic")
+    parser.add_argument("--output", default="models/gesture_model.npz")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--k", type=int, default=5, help="Neighbours for the knn model")
+    parser.add_argument(
+        "--evaluate", metavar="MODEL", help="Only evaluate an existing model file"
+    )
+    args = parser.parse_args()
+
+    landmarks, labels = load_dataset(collect_paths(args.inputs))
+    if not landmarks:
+        logger.error("No labeled landmark frames found")
+        return
+    features = landmarks_to_features(landmarks)
+
+    rules = HandGestureDetector(use_mediapipe=False)
+    report(
+        "rules",
+        labels,
+        np.array([rules.detect_gesture_detailed(lm) for lm in landmarks]),
+    )
+
+    if args.evaluate:
+        model = load_gesture_model(args.evaluate)
+        report(model.name, labels, model.predict(features))
+        return
+
+    predictions, evaluated = cross_validate(
+        args.model, features, labels, args.folds, args.seed, args.k
+    )
+    report(
+        f"{args.model} ({args.folds}-fold)", labels[evaluated], predictions[evaluated]
+    )
+
+    model = build_model(args.model, args.k).fit(features, labels)
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    model.save(args.output)
+    logger.info(f"Saved {args.model} model to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
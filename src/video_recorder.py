@@ -0,0 +1,262 @@
+# src/video_recorder.py
+import ctypes
+import os
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+from OpenGL.GL import *
+
+from src.common import logger
+from src.frame_bus import FrameBus
+
+
+# notes: 描画結果をPBO経由で非同期に読み出すクラス
+# フレームNで読み出しを開始し、フレームN+1でマップするので、描画スレッドがGPUの完了を待たない
+# マップした領域は使い回しのバッファへ上下を反転しながら1回だけ写し、録画が使い終わるまで参照を持たせる
+# 返すフレームの captured_at は読み出しを開始した時刻（そのフレームを描画し終えた時刻）
+class ScenePixelReader:
+    def __init__(self, width, height, buffer_count=2, max_frames=16):
+        self.width = width
+        self.height = height
+        self.size = width * height * 3
+        self.buffers = glGenBuffers(buffer_count)
+        if buffer_count == 1:
+            self.buffers = [self.buffers]
+        for buffer in self.buffers:
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, buffer)
+            glBufferData(GL_PIXEL_PACK_BUFFER, self.size, None, GL_STREAM_READ)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.index = 0
+        self.pending = 0
+        self.read_times = [None] * len(self.buffers)
+        self.discard_before = None
+        self.frames = FrameBus(ring_size=4, max_buffers=max_frames, mirror=False)
+
+    # notes: 前のフレームで開始した読み出しの結果を返し、今のフレームの読み出しを開始する
+    # 返り値はフレームバスの slot で、使い回しのバッファが足りない場合は None になる
+    def read(self):
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        glReadBuffer(GL_BACK)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.buffers[self.index])
+        glReadPixels(
+            0,
+            0,
+            self.width,
+            self.height,
+            GL_BGR,
+            GL_UNSIGNED_BYTE,
+            ctypes.c_void_p(0),
+        )
+        self.read_times[self.index] = time.perf_counter()
+
+        slot = None
+        self.index = (self.index + 1) % len(self.buffers)
+        if self.pending >= len(self.buffers) - 1:
+            read_at = self.read_times[self.index]
+            # notes: reset より前に読み出しを開始したフレームは前の区切りのものなので返さない
+            if self.discard_before is not None and read_at < self.discard_before:
+                glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+                return None
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, self.buffers[self.index])
+            pointer = glMapBuffer(GL_PIXEL_PACK_BUFFER, GL_READ_ONLY)
+            if pointer:
+                mapped = np.ctypeslib.as_array(
+                    ctypes.cast(pointer, ctypes.POINTER(ctypes.c_ubyte)),
+                    shape=(self.height, self.width, 3),
+                )
+                # notes: glReadPixels は下の行から並ぶので、写すときに上下を反転する
+                slot = self.frames.write(mapped, read_at, flip_code=0)
+                glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+        else:
+            self.pending += 1
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        return slot
+
+    # notes: 録画の区切りの開始時に呼び、読み出し中のフレームを捨てて最初からやり直す
+    # 捨てないと、新しい区切りの最初のフレームが前の区切りの最後のフレームになる
+    def reset(self):
+        self.pending = 0
+        self.discard_before = time.perf_counter()
+
+    def release(self):
+        glDeleteBuffers(len(self.buffers), self.buffers)
+
+
+# notes: ラウンドごとのリプレイ動画を保存するクラス
+# 描画スレッドは有界キューにフレームを積むだけで、エンコードはバックグラウンドのワーカーが行う
+# キューが一杯になった場合はゲームを待たせず、drop_policy に従ってフレームを捨てる
+# フレームバスのバッファを渡された場合は、書き込むか捨てるまで参照を持つ
+# frame_bus を指定するとカメラの映像はバスを購読して受け取り、区切りの指示とはバスの連番で順序を合わせる
+class RoundRecorder:
+    def __init__(
+        self,
+        output_dir,
+        fps=30,
+        source_fps=60,
+        max_queue=90,
+        drop_policy="oldest",
+        codec="mp4v",
+        frame_bus=None,
+    ):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self.fps = fps
+        self.frame_stride = max(1, round(source_fps / fps))
+        self.max_queue = max_queue
+        self.drop_policy = drop_policy
+        self.fourcc = cv2.VideoWriter_fourcc(*codec)
+
+        self.active = False
+        self.segment_name = None
+        self.frame_counter = 0
+        self.frames_written = 0
+        self.frames_dropped = 0
+
+        self.frame_bus = frame_bus
+        self.subscription = None
+        if frame_bus:
+            self.subscription = frame_bus.subscribe(
+                "recorder", max_rate=fps, max_queue=max_queue, drop_policy=drop_policy
+            )
+            self.subscription.paused = True
+
+        self._queue = deque()
+        self._queued_frames = 0
+        self._condition = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name="RoundRecorder", daemon=True
+        )
+        self._thread.start()
+
+    def _put(self, item, is_frame):
+        with self._condition:
+            if is_frame and self._queued_frames >= self.max_queue:
+                self.frames_dropped += 1
+                if self.drop_policy == "newest":
+                    self._release(item)
+                    return
+                # notes: 区切りの指示は捨てずに、最も古いフレームだけを捨てる
+                for i, queued in enumerate(self._queue):
+                    if queued[0] == "frame":
+                        del self._queue[i]
+                        self._queued_frames -= 1
+                        self._release(queued)
+                        break
+            self._queue.append(item)
+            if is_frame:
+                self._queued_frames += 1
+            self._condition.notify()
+
+    def start_segment(self, name):
+        if self.active:
+            self.end_segment()
+        self.active = True
+        self.segment_name = name
+        self.frame_counter = 0
+        self._put(("start", name, None, None, self._sequence()), False)
+        if self.subscription:
+            self.subscription.paused = False
+
+    def end_segment(self):
+        if not self.active:
+            return
+        self.active = False
+        if self.subscription:
+            self.subscription.paused = True
+        self._put(("end", self.segment_name, None, None, self._sequence()), False)
+
+    # notes: 区切りの指示より前に公開されたカメラのフレームは、連番が指示の連番以下になる
+    def _sequence(self):
+        return self.frame_bus.sequence if self.frame_bus else 0
+
+    # notes: フレームを間引いて記録するかどうか（バスを購読していない場合はカメラとシーンで同じ判定を使う）
+    def wants_frame(self):
+        return self.active and self.frame_counter % self.frame_stride == 0
+
+    def advance(self):
+        self.frame_counter += 1
+
+    def submit(self, stream, frame, slot=None):
+        if slot is not None:
+            slot.retain()
+        self._put(("frame", stream, frame, slot, self._sequence()), True)
+
+    @staticmethod
+    def _release(item):
+        if item[3] is not None:
+            item[3].release()
+
+    def _run(self):
+        writers = {}
+        name = None
+        while True:
+            # notes: 購読している場合は、区切りの指示に気付けるように一定時間で待つのをやめる
+            slot = None
+            if self.subscription:
+                slot = self.subscription.get(timeout=0.05)
+            with self._condition:
+                if self.subscription is None:
+                    while self._running and not self._queue:
+                        self._condition.wait()
+                # notes: 取り出したカメラのフレームより前に積まれた指示とフレームを先に処理する
+                items = []
+                while self._queue and (
+                    slot is None or self._queue[0][4] < slot.sequence
+                ):
+                    item = self._queue.popleft()
+                    if item[0] == "frame":
+                        self._queued_frames -= 1
+                    items.append(item)
+                finished = not self._running and not self._queue and slot is None
+
+            for item in items:
+                name = self._handle(item, writers, name)
+            if slot is not None:
+                item = ("frame", "camera", slot.frame, slot, slot.sequence)
+                name = self._handle(item, writers, name)
+            if finished:
+                break
+        self._close_writers(writers)
+
+    def _handle(self, item, writers, name):
+        kind, value, frame, _, _ = item
+        if kind == "start":
+            self._close_writers(writers)
+            return value
+        if kind == "end":
+            self._close_writers(writers)
+            return None
+        if name is not None:
+            writer = writers.get(value)
+            if writer is None:
+                height, width = frame.shape[:2]
+                path = os.path.join(self.output_dir, f"{name}_{value}.mp4")
+                writer = cv2.VideoWriter(path, self.fourcc, self.fps, (width, height))
+                writers[value] = writer
+            writer.write(frame)
+            self.frames_written += 1
+        self._release(item)
+        return name
+
+    def _close_writers(self, writers):
+        for writer in writers.values():
+            writer.release()
+        writers.clear()
+
+    def close(self):
+        self.end_segment()
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join()
+        dropped = self.frames_dropped
+        if self.subscription:
+            dropped += self.subscription.dropped
+            self.subscription.close()
+        logger.info(
+            f"Recorder: {self.frames_written} frames written, {dropped} dropped"
+        )